@@ -1,8 +1,39 @@
-from flask import Flask, jsonify, request
+import time
+from itertools import chain
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
 from clients.mongo_client import mongo_client
 from clients.neo4j_client import neo4j_client
-from neo4j.graph import Node, Relationship
+from clients.config import Config
+from services import fanout, metrics, pagination
+from services.cache import normalize_query, response_cache
+from services.health import health_prober
+from services.graph_snapshot import BOTH, IN, OUT, graph_snapshot
+from services.search_index import label_index
+from services.queries import (
+    NODES_CYPHER,
+    SEARCH_BATCH_CYPHER,
+    SEARCH_BATCH_NODES_CYPHER,
+    SEARCH_BY_IDS_CYPHER,
+    SEARCH_CYPHER,
+    SEARCH_NODES_BY_IDS_CYPHER,
+    SEARCH_NODES_CYPHER,
+    cacheable,
+    doc_matches,
+    mongo_nodes_filter,
+    mongo_rels_filter,
+    neo4j_ids,
+    parse_max_rows,
+    search_flags,
+    search_response,
+    search_results,
+    snapshot_ready,
+    sort_by_ids,
+    split_rels,
+    with_relations,
+)
+from services.sync import FULL, INCREMENTAL, graph_sync
+from services.serializer import dumps_line, json_response
 
 # -------------------------------------------------
 # KHỞI TẠO APP FLASK
@@ -11,6 +42,66 @@ app = Flask(__name__)
 CORS(app)     # Cho phép API được gọi từ chatbot bên ngoài
 
 
+# -------------------------------------------------
+# METRICS: ĐO THỜI GIAN TỪNG REQUEST
+# -------------------------------------------------
+@app.before_request
+def _start_timer():
+    g.started = time.perf_counter()
+
+
+@app.before_request
+def _start_background():
+    """Khởi động các thread nền trong worker (sau khi gunicorn fork)"""
+    health_prober.ensure_started()
+    if Config.SEARCH_INDEX_ENABLED:
+        label_index.ensure_started()
+    if Config.GRAPH_SNAPSHOT_ENABLED:
+        graph_snapshot.ensure_started()
+
+
+@app.after_request
+def _record_request(response):
+    started = g.pop("started", None)
+    if started is None or not Config.METRICS_ENABLED:
+        return response
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    labels = {"route": route, "method": request.method, "status": response.status_code}
+
+    def record():
+        metrics.registry.observe("http_request_duration_seconds", labels, time.perf_counter() - started)
+
+    if response.is_streamed:
+        # NDJSON: lúc này chưa gửi byte nào, đo đến khi stream xong (response được đóng)
+        response.call_on_close(record)
+    else:
+        record()
+    if response.content_length:
+        metrics.registry.inc("http_response_bytes_total", {"route": route}, response.content_length)
+    return response
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Metrics dạng Prometheus, gộp mọi worker khi có METRICS_DIR"""
+    if not Config.METRICS_ENABLED:
+        return jsonify({"ok": False, "error": "Metrics đang tắt"}), 404
+    body = metrics.render(metrics.registry.collect())
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+# -------------------------------------------------
+# CACHE RESPONSE
+# -------------------------------------------------
+def _cached(route, params, ttl, compute):
+    """Gọi compute() qua response_cache; compute trả về (payload, status)"""
+    if not Config.CACHE_ENABLED:
+        payload, status = compute()
+    else:
+        payload, status = response_cache.get_or_compute(route, params, ttl, compute, cacheable)
+    return json_response(payload, status)
+
+
 # -------------------------------------------------
 # ROUTE KIỂM TRA
 # -------------------------------------------------
@@ -25,21 +116,11 @@ def index():
 # -------------------------------------------------
 @app.route("/health", methods=["GET"])
 def health():
-    status = {}
-
-    # Check MongoDB
-    try:
-        collections = mongo_client.db.list_collection_names()
-        status["mongo"] = {"ok": True, "collections": collections}
-    except Exception as e:
-        status["mongo"] = {"ok": False, "error": str(e)}
-
-    # Check Neo4j
-    try:
-        result = neo4j_client.run_query("RETURN 1 AS ok")
-        status["neo4j"] = {"ok": True, "result": result}
-    except Exception as e:
-        status["neo4j"] = {"ok": False, "error": str(e)}
+    # trạng thái do health_prober kiểm tra định kỳ, không gọi backend trong request
+    status = {
+        "mongo": health_prober.status("mongo"),
+        "neo4j": health_prober.status("neo4j"),
+    }
 
     return jsonify({
         "ok": status["mongo"]["ok"] and status["neo4j"]["ok"],
@@ -53,7 +134,7 @@ def health():
 @app.route("/neo4j/test", methods=["GET"])
 def neo4j_test():
     try:
-        result = neo4j_client.run_query("RETURN 1 AS ok")
+        result = neo4j_client.run_query("RETURN 1 AS ok", op="health")
         return jsonify({"ok": True, "data": result})
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
@@ -61,25 +142,96 @@ def neo4j_test():
 
 @app.route("/neo4j/health", methods=["GET"])
 def neo4j_health():
-    return neo4j_test()
+    status = health_prober.status("neo4j")
+    if not status["ok"]:
+        return jsonify(status), 500
+    return jsonify({"ok": True, "data": status.get("result"),
+                    "latency_ms": status["latency_ms"], "checked_at": status["checked_at"]})
 
 
 # -------------------------------------------------
 # API MONGO: LẤY DỮ LIỆU (MẶC ĐỊNH DÙNG 'nodes')
 # -------------------------------------------------
+def _ndjson_export(cursor, key, fields):
+    """
+    Xuất cursor dạng NDJSON, dòng cuối có token 'next' để chạy tiếp.
+    Mỗi lượt dừng sau MONGO_EXPORT_MAX_DOCS document / MONGO_EXPORT_MAX_SECONDS giây.
+    """
+    count, last, started = 0, None, time.monotonic()
+    try:
+        for doc in cursor:
+            last = doc.get(key)
+            yield dumps_line(pagination.clean_doc(doc, fields))
+            count += 1
+            if count >= Config.MONGO_EXPORT_MAX_DOCS or time.monotonic() - started >= Config.MONGO_EXPORT_MAX_SECONDS:
+                yield dumps_line({"ok": True, "count": count, "next": pagination.encode_cursor(key, last)})
+                return
+    except Exception as e:
+        nxt = pagination.encode_cursor(key, last) if last is not None else None
+        yield dumps_line({"ok": False, "count": count, "next": nxt, "error": str(e)})
+        return
+    finally:
+        cursor.close()
+    yield dumps_line({"ok": True, "count": count, "next": None})
+
+
 @app.route("/mongo/products", methods=["GET"])
 def get_mongo_products():
-    limit = int(request.args.get("limit", 10))
     # nếu có collection 'products' thì đổi lại; hiện bạn chỉ có 'nodes', 'rels'
     collection_name = request.args.get("collection", "nodes")
+    key = request.args.get("key", "_id")
+    after_token = request.args.get("after", "")
+    export = request.args.get("export")
 
     try:
-        col = mongo_client.get_collection(collection_name)
-        cursor = col.find({}, {"_id": 0}).limit(limit)
-        data = list(cursor)
-        return jsonify({"ok": True, "count": len(data), "data": data})
-    except Exception as e:
-        return jsonify({"ok": False, "error": str(e)}), 500
+        limit = pagination.parse_int(request.args.get("limit"), 10, "limit", Config.MONGO_PAGE_MAX_LIMIT)
+        if key not in pagination.PAGE_KEYS:
+            raise ValueError(f"Tham số 'key' phải là một trong {list(pagination.PAGE_KEYS)}")
+        after = None
+        if after_token:
+            key, after = pagination.decode_cursor(after_token)
+        fields = pagination.parse_fields(request.args.get("fields"))
+        flt = pagination.parse_filter(request.args.get("filter"))
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+
+    if key != "_id":
+        flt = {"$and": [flt, {key: {"$exists": True}}]} if flt else {key: {"$exists": True}}
+    query = pagination.page_query(flt, key, after)
+    projection = pagination.page_projection(fields, key)
+
+    # ========== EXPORT: STREAM TOÀN BỘ COLLECTION ==========
+    if export == "ndjson":
+        try:
+            col = mongo_client.get_collection(collection_name)
+            cursor = (col.find(query, projection)
+                      .sort(key, 1)
+                      .batch_size(Config.MONGO_EXPORT_BATCH_SIZE))
+        except Exception as e:
+            return jsonify({"ok": False, "error": str(e)}), 500
+        return Response(
+            stream_with_context(_ndjson_export(cursor, key, fields)),
+            mimetype="application/x-ndjson",
+        )
+
+    # ========== PHÂN TRANG KEYSET ==========
+    def compute():
+        try:
+            col = mongo_client.get_collection(collection_name)
+            cursor = col.find(query, projection).sort(key, 1).limit(limit + 1)
+            data = list(cursor)
+            nxt = None
+            if len(data) > limit:
+                data = data[:limit]
+                nxt = pagination.encode_cursor(key, data[-1][key])
+            data = [pagination.clean_doc(d, fields) for d in data]
+            return {"ok": True, "count": len(data), "data": data, "next": nxt}, 200
+        except Exception as e:
+            return {"ok": False, "error": str(e)}, 500
+
+    params = "|".join([collection_name, str(limit), key, after_token,
+                       ",".join(fields), request.args.get("filter", "")])
+    return _cached("mongo_products", params, Config.CACHE_TTL_MONGO_PRODUCTS, compute)
 
 
 @app.route("/products", methods=["GET"])
@@ -90,62 +242,75 @@ def get_products_alias():
 # -------------------------------------------------
 # API NEO4J: LẤY NODE (CHUẨN HÓA JSON)
 # -------------------------------------------------
-def normalize_node(n):
-    """Chuẩn hóa dữ liệu node từ Aura Free hoặc Node object"""
-    if isinstance(n, Node):
-        return {
-            "id": n.id,
-            "labels": list(n.labels),
-            "properties": dict(n)
-        }
-    if isinstance(n, dict):   # Aura free
-        labels = n.get("labels", [])
-        props = {k: v for k, v in n.items() if k != "labels"}
-        return {
-            "id": props.get("id"),
-            "labels": labels,
-            "properties": props
-        }
-    return {"value": str(n)}
-
-
 @app.route("/neo4j/nodes", methods=["GET"])
 def get_nodes():
-    limit = int(request.args.get("limit", 20))
-
     try:
-        cypher = "MATCH (n) RETURN n LIMIT $limit"
-        result = neo4j_client.run_query(cypher, {"limit": limit})
+        limit = pagination.parse_int(request.args.get("limit"), 20, "limit", Config.NEO4J_NODES_MAX_LIMIT)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
 
-        data = [normalize_node(row["n"]) for row in result]
+    def compute():
+        try:
+            result = neo4j_client.run_query(NODES_CYPHER, {"limit": limit}, raw=True, op="nodes")
 
-        return jsonify({"ok": True, "count": len(data), "data": data})
-    except Exception as e:
-        return jsonify({"ok": False, "error": str(e)}), 500
+            data = [row["n"] for row in result]
+
+            return {"ok": True, "count": len(data), "data": data}, 200
+        except Exception as e:
+            return {"ok": False, "error": str(e)}, 500
+
+    return _cached("neo4j_nodes", str(limit), Config.CACHE_TTL_NEO4J_NODES, compute)
 
 
 # -------------------------------------------------
 # API NEO4J: CHẠY CYPHER
 # -------------------------------------------------
-def convert_value(v):
-    """Chuẩn hóa giá trị trả về từ Neo4j"""
-    if isinstance(v, Node):
-        return {
-            "id": v.id,
-            "labels": list(v.labels),
-            "properties": dict(v),
-        }
-    if isinstance(v, Relationship):
-        return {
-            "id": v.id,
-            "type": v.type,
-            "start_node_id": v.start_node.id,
-            "end_node_id": v.end_node.id,
-            "properties": dict(v),
-        }
-    if isinstance(v, dict):
-        return v
-    return v
+def _ndjson_rows(first, result, max_rows):
+    """Ghi từng dòng NDJSON ngay khi chuyển đổi xong, dòng cuối là tổng kết"""
+    count, truncated = 0, False
+    try:
+        for r in chain(() if first is None else (first,), result):
+            if count >= max_rows:
+                truncated = True
+                break
+            yield dumps_line(r)
+            count += 1
+    except Exception as e:
+        yield dumps_line({"ok": False, "count": count, "error": str(e)})
+        return
+    finally:
+        result.close()
+    yield dumps_line({"ok": True, "count": count, "truncated": truncated})
+
+
+@app.route("/neo4j/query/batch", methods=["POST"])
+def run_neo4j_query_batch():
+    data = request.get_json(force=True, silent=True) or {}
+    queries = data.get("queries")
+
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"ok": False, "error": "Thiếu 'queries' (list) trong body"}), 400
+    if len(queries) > Config.NEO4J_BATCH_MAX_QUERIES:
+        return jsonify({"ok": False,
+                        "error": f"Tối đa {Config.NEO4J_BATCH_MAX_QUERIES} query mỗi request"}), 400
+    statements = []
+    for q in queries:
+        if isinstance(q, str):
+            q = {"query": q}
+        if not isinstance(q, dict) or not q.get("query"):
+            return jsonify({"ok": False, "error": "Mỗi phần tử cần có 'query'"}), 400
+        statements.append({"query": q["query"], "params": q.get("params") or {}})
+
+    try:
+        max_rows = parse_max_rows(data.get("max_rows"))
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    try:
+        results = neo4j_client.run_read_batch(statements, timeout=Config.NEO4J_BATCH_TIMEOUT,
+                                              max_rows=max_rows, raw=True)
+        return json_response({"ok": True, "count": len(results), "results": results})
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
 
 
 @app.route("/neo4j/query", methods=["POST"])
@@ -153,15 +318,41 @@ def run_neo4j_query():
     data = request.get_json(force=True, silent=True) or {}
     query = data.get("query")
     params = data.get("params") or {}
+    stream = request.args.get("stream") or data.get("stream")
 
     if not query:
         return jsonify({"ok": False, "error": "Thiếu 'query' trong body"}), 400
+    try:
+        max_rows = parse_max_rows(data.get("max_rows"))
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
 
     try:
-        result = neo4j_client.run_query(query, params)
-        rows = [{k: convert_value(v) for k, v in r.items()} for r in result]
+        result = neo4j_client.stream_query(query, params, raw=True, op="adhoc")
+        # lấy dòng đầu tiên trước để lỗi cú pháp / kết nối vẫn trả về mã 500
+        first = next(result, None)
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+    if stream == "ndjson":
+        return Response(
+            stream_with_context(_ndjson_rows(first, result, max_rows)),
+            mimetype="application/x-ndjson",
+        )
 
-        return jsonify({"ok": True, "count": len(rows), "data": rows})
+    try:
+        rows, truncated = [], False
+        try:
+            for r in chain(() if first is None else (first,), result):
+                if len(rows) >= max_rows:
+                    truncated = True
+                    break
+                rows.append(r)
+        finally:
+            # trả session về pool cả khi đọc dòng bị lỗi (giống _ndjson_rows)
+            result.close()
+
+        return json_response({"ok": True, "count": len(rows), "truncated": truncated, "data": rows})
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
 
@@ -169,79 +360,322 @@ def run_neo4j_query():
 # -------------------------------------------------
 # API SEARCH CHO CHATBOT (DUY NHẤT)
 # -------------------------------------------------
+def _search_rows(cypher, nodes_cypher, params, timeout, op):
+    """Chạy Cypher tìm kiếm; dùng graph_snapshot cho quan hệ thay vì OPTIONAL MATCH nếu có"""
+    if snapshot_ready():
+        return with_relations(neo4j_client.run_query(nodes_cypher, params, timeout=timeout, op=op))
+    return neo4j_client.run_query(cypher, params, timeout=timeout, op=op)
+
+
+def _search_neo4j(q, timeout):
+    """Tìm node trong Neo4j theo rdfs__label"""
+    return search_results(_search_rows(SEARCH_CYPHER, SEARCH_NODES_CYPHER, {"q": q}, timeout, "search"))
+
+
+def _search_mongo_nodes(q, max_time_ms):
+    """Tìm node trong mongo theo props.rdfs__label hoặc labels"""
+    nodes_coll = mongo_client.db["nodes"]
+    return list(nodes_coll.find(mongo_nodes_filter(q), {"_id": 0}).max_time_ms(max_time_ms))
+
+
+def _search_neo4j_by_ids(ids, timeout, with_id=False):
+    """Lấy node trong Neo4j theo id đã tìm được từ label_index (giữ thứ hạng)"""
+    if not ids:
+        return []
+    neo4j_rows = _search_rows(SEARCH_BY_IDS_CYPHER, SEARCH_NODES_BY_IDS_CYPHER,
+                              {"ids": neo4j_ids(ids)}, timeout, "search_ids")
+    return search_results(neo4j_rows, with_id)
+
+
+def _search_mongo_nodes_by_ids(ids, max_time_ms):
+    """Lấy node trong mongo theo neo4j_id (truy vấn theo khóa, giữ thứ hạng)"""
+    if not ids:
+        return []
+    nodes_coll = mongo_client.db["nodes"]
+    docs = list(nodes_coll.find({"neo4j_id": {"$in": ids}}, {"_id": 0}).max_time_ms(max_time_ms))
+    return sort_by_ids(docs, ids)
+
+
+def _search_mongo_rels(neo_ids, max_time_ms):
+    """Tìm rel trong mongo nối với các node đã tìm được"""
+    rels_coll = mongo_client.db["rels"]
+    rel_ids = None
+    if snapshot_ready():
+        rel_ids = graph_snapshot.edge_ids(neo_ids)
+        if not rel_ids:
+            return []
+    return list(rels_coll.find(mongo_rels_filter(neo_ids, rel_ids), {"_id": 0}).max_time_ms(max_time_ms))
+
+
 @app.route("/search", methods=["GET"])
 def search():
     q = request.args.get("query", "").strip()
     if not q:
         return jsonify({"ok": False, "error": "Thiếu tham số ?query="}), 400
 
-    # ========== NEO4J SEARCH ==========
-    cypher = """
-    MATCH (n)
-    WHERE exists(n.rdfs__label)
-      AND toLower(n.rdfs__label) CONTAINS toLower($q)
-
-    OPTIONAL MATCH (n)-[r]->(m)
-
-    RETURN DISTINCT
-      n {.*, label: n.rdfs__label, labels: labels(n)} AS node,
-      collect(DISTINCT {
-        type: type(r),
-        target_label: coalesce(m.rdfs__label, ""),
-        target_labels: labels(m)
-      }) AS relations
+    return _cached("search", normalize_query(q), Config.CACHE_TTL_SEARCH,
+                   lambda: _search_payload(q))
+
+
+def _fanout_search(neo4j_call, nodes_call):
     """
+    Chạy song song Neo4j và (Mongo nodes -> Mongo rels), mỗi bên có deadline riêng.
+    neo4j_call(timeout) / nodes_call(max_time_ms) là hàm gọi backend.
+    Trả về (neo4j_results, mongo_nodes, mongo_rels, flags) với flags chứa *_error / timed_out.
+    """
+    timed_out = []
+    neo4j_deadline = fanout.deadline_after(Config.SEARCH_NEO4J_TIMEOUT)
+    mongo_deadline = fanout.deadline_after(Config.SEARCH_MONGO_TIMEOUT)
+    mongo_ms = max(1, int(Config.SEARCH_MONGO_TIMEOUT * 1000))
 
-    try:
-        neo4j_rows = neo4j_client.run_query(cypher, {"q": q})
-        neo4j_results = [{
-            "node": row.get("node"),
-            "relations": row.get("relations", [])
-        } for row in neo4j_rows]
-    except Exception as e:
-        neo4j_results = []
-        neo4j_error = str(e)
-    else:
-        neo4j_error = None
-
-    # ========== MONGODB SEARCH ==========
-    db = mongo_client.db  # fruit_graph
-    nodes_coll = db["nodes"]
-    rels_coll = db["rels"]
-
-    # tìm node trong mongo
-    mongo_nodes = list(nodes_coll.find({
-        "$or": [
-            {"props.rdfs__label": {"$regex": q, "$options": "i"}},
-            {"labels": {"$elemMatch": {"$regex": q, "$options": "i"}}}
-        ]
-    }, {"_id": 0}))
-
-    # lấy danh sách id node phù hợp
-    neo_ids = [n.get("neo4j_id") for n in mongo_nodes if "neo4j_id" in n]
+    # ========== GỬI SONG SONG NEO4J + MONGO NODES ==========
+    neo4j_future = fanout.submit(neo4j_call, Config.SEARCH_NEO4J_TIMEOUT)
+    nodes_future = fanout.submit(nodes_call, mongo_ms)
 
-    # tìm rel trong mongo
+    # ========== MONGODB: NODES -> RELS ==========
+    mongo_nodes, mongo_error, mongo_timed_out = fanout.collect(nodes_future, mongo_deadline)
+    mongo_nodes = mongo_nodes or []
+    mongo_rels = []
+
+    # lấy danh sách id node phù hợp, gửi truy vấn rels ngay khi có id
+    neo_ids = [n.get("neo4j_id") for n in mongo_nodes if "neo4j_id" in n]
     if neo_ids:
-        mongo_rels = list(rels_coll.find({
-            "$or": [
-                {"start_neo4j_id": {"$in": neo_ids}},
-                {"end_neo4j_id": {"$in": neo_ids}}
-            ]
-        }, {"_id": 0}))
+        left_ms = int(fanout.remaining(mongo_deadline) * 1000)
+        if left_ms > 0:
+            rels_future = fanout.submit(_search_mongo_rels, neo_ids, left_ms)
+            mongo_rels, mongo_error, mongo_timed_out = fanout.collect(rels_future, mongo_deadline)
+            mongo_rels = mongo_rels or []
+        else:
+            mongo_error, mongo_timed_out = "Quá thời gian chờ", True
+    if mongo_timed_out:
+        timed_out.append("mongo")
+
+    # ========== NEO4J ==========
+    neo4j_results, neo4j_error, neo4j_timed_out = fanout.collect(neo4j_future, neo4j_deadline)
+    neo4j_results = neo4j_results or []
+    if neo4j_timed_out:
+        timed_out.append("neo4j")
+
+    return neo4j_results, mongo_nodes, mongo_rels, search_flags(neo4j_error, mongo_error, timed_out)
+
+
+def _search_payload(q):
+    """Chạy tìm kiếm trên Neo4j + MongoDB, trả về (payload, status)"""
+    # Dùng label_index khi đã nạp xong, nếu chưa thì quay về regex / CONTAINS
+    if Config.SEARCH_INDEX_ENABLED and label_index.ready:
+        ids = label_index.search(q, Config.SEARCH_RESULT_LIMIT)
+        neo4j_results, mongo_nodes, mongo_rels, flags = _fanout_search(
+            lambda timeout: _search_neo4j_by_ids(ids, timeout),
+            lambda ms: _search_mongo_nodes_by_ids(ids, ms),
+        )
     else:
-        mongo_rels = []
+        neo4j_results, mongo_nodes, mongo_rels, flags = _fanout_search(
+            lambda timeout: _search_neo4j(q, timeout),
+            lambda ms: _search_mongo_nodes(q, ms),
+        )
 
     # ========== RETURN ==========
-    resp = {
-        "query": q,
-        "neo4j_results": neo4j_results,
-        "mongo_nodes": mongo_nodes,
-        "mongo_rels": mongo_rels,
-    }
-    if neo4j_error:
-        resp["neo4j_error"] = neo4j_error
+    return search_response(q, neo4j_results, mongo_nodes, mongo_rels, flags)
+
+
+# -------------------------------------------------
+# API SEARCH BATCH: NHIỀU THỰC THỂ TRONG MỘT LƯỢT CHATBOT
+# -------------------------------------------------
+def _search_batch_neo4j(terms, timeout):
+    """Một câu Cypher UNWIND $terms cho mọi term, trả về {term: [results]}"""
+    rows = _search_rows(SEARCH_BATCH_CYPHER, SEARCH_BATCH_NODES_CYPHER,
+                        {"terms": terms}, timeout, "search_batch")
+    out = {t: [] for t in terms}
+    for row in rows:
+        out.setdefault(row.get("term"), []).append({
+            "node": row.get("node"),
+            "relations": row.get("relations", [])
+        })
+    return out
+
+
+def _search_batch_mongo_nodes(terms, max_time_ms):
+    """Một truy vấn $or gộp regex của mọi term"""
+    nodes_coll = mongo_client.db["nodes"]
+    clauses = [c for t in terms for c in mongo_nodes_filter(t)["$or"]]
+    return list(nodes_coll.find({"$or": clauses}, {"_id": 0}).max_time_ms(max_time_ms))
+
+
+def _search_batch_payload(terms):
+    """Tìm nhiều term với một round trip mỗi backend, rồi tách kết quả theo term"""
+    if Config.SEARCH_INDEX_ENABLED and label_index.ready:
+        term_ids = {t: label_index.search(t, Config.SEARCH_RESULT_LIMIT) for t in terms}
+        all_ids = list(dict.fromkeys(i for ids in term_ids.values() for i in ids))
+        neo4j_rows, mongo_nodes, mongo_rels, flags = _fanout_search(
+            lambda timeout: _search_neo4j_by_ids(all_ids, timeout, with_id=True),
+            lambda ms: _search_mongo_nodes_by_ids(all_ids, ms),
+        )
+        neo4j_by_id = {row.pop("nid"): row for row in neo4j_rows}
+        mongo_by_id = {d.get("neo4j_id"): d for d in mongo_nodes}
+        results = []
+        for t in terms:
+            ids = term_ids[t]
+            results.append({
+                "query": t,
+                "neo4j_results": [neo4j_by_id[i] for i in neo4j_ids(ids) if i in neo4j_by_id],
+                "mongo_nodes": [mongo_by_id[i] for i in ids if i in mongo_by_id],
+                "mongo_rels": split_rels(mongo_rels, ids),
+            })
+    else:
+        neo4j_by_term, mongo_nodes, mongo_rels, flags = _fanout_search(
+            lambda timeout: _search_batch_neo4j(terms, timeout),
+            lambda ms: _search_batch_mongo_nodes(terms, ms),
+        )
+        neo4j_by_term = neo4j_by_term or {}
+        results = []
+        for t in terms:
+            nodes = [d for d in mongo_nodes if doc_matches(d, t)]
+            results.append({
+                "query": t,
+                "neo4j_results": neo4j_by_term.get(t, []),
+                "mongo_nodes": nodes,
+                "mongo_rels": split_rels(mongo_rels, [d.get("neo4j_id") for d in nodes]),
+            })
+
+    resp = {"ok": True, "count": len(results), "results": results}
+    resp.update(flags)
+    return resp, 200
+
+
+@app.route("/search/batch", methods=["POST"])
+def search_batch():
+    data = request.get_json(force=True, silent=True) or {}
+    terms = data.get("terms")
+    if not isinstance(terms, list) or not terms:
+        return jsonify({"ok": False, "error": "Thiếu 'terms' (list) trong body"}), 400
+    terms = list(dict.fromkeys(str(t).strip() for t in terms if str(t).strip()))
+    if not terms:
+        return jsonify({"ok": False, "error": "Thiếu 'terms' (list) trong body"}), 400
+    if len(terms) > Config.SEARCH_BATCH_MAX_TERMS:
+        return jsonify({"ok": False,
+                        "error": f"Tối đa {Config.SEARCH_BATCH_MAX_TERMS} term mỗi request"}), 400
 
-    return jsonify(resp)
+    key = "|".join(normalize_query(t) for t in terms)
+    return _cached("search_batch", key, Config.CACHE_TTL_SEARCH,
+                   lambda: _search_batch_payload(terms))
+
+
+# -------------------------------------------------
+# API GRAPH: LÁNG GIỀNG K BƯỚC TỪ SNAPSHOT TRONG BỘ NHỚ
+# -------------------------------------------------
+@app.route("/graph/neighbors", methods=["GET"])
+def graph_neighbors():
+    """
+    /graph/neighbors?id=<neo4j_id>&depth=2&types=GROWN_IN,HAS_USE&direction=both&limit=100
+    Ví dụ: xoài -GROWN_IN-> vùng <-GROWN_IN- các loại trái cây khác (depth=2).
+    """
+    nid = request.args.get("id", "").strip()
+    if not nid:
+        return jsonify({"ok": False, "error": "Thiếu tham số ?id="}), 400
+    if not Config.GRAPH_SNAPSHOT_ENABLED:
+        return jsonify({"ok": False, "error": "Graph snapshot đang tắt"}), 503
+    if not graph_snapshot.ready:
+        return jsonify({"ok": False, "error": "Graph snapshot đang nạp dữ liệu"}), 503
+
+    try:
+        depth = int(request.args.get("depth", 1))
+        limit = int(request.args.get("limit", Config.GRAPH_NEIGHBORS_LIMIT))
+    except ValueError:
+        return jsonify({"ok": False, "error": "depth / limit phải là số nguyên"}), 400
+    depth = max(1, min(depth, Config.GRAPH_NEIGHBORS_MAX_DEPTH))
+    limit = max(1, min(limit, Config.GRAPH_NEIGHBORS_LIMIT))
+    direction = request.args.get("direction", BOTH)
+    if direction not in (OUT, IN, BOTH):
+        return jsonify({"ok": False, "error": "direction phải là out, in hoặc both"}), 400
+    types = [t.strip() for t in request.args.get("types", "").split(",") if t.strip()]
+
+    result = graph_snapshot.neighbors(nid, depth=depth, types=types or None,
+                                      direction=direction, limit=limit)
+    if result is None:
+        return jsonify({"ok": False, "error": f"Không tìm thấy node {nid}"}), 404
+    return json_response({
+        "ok": True,
+        "id": result["node"]["id"],
+        "depth": depth,
+        "count": len(result["neighbors"]),
+        **result,
+    })
+
+
+# -------------------------------------------------
+# ADMIN: QUẢN LÝ CACHE
+# -------------------------------------------------
+def _check_admin():
+    """Trả về response lỗi nếu request không có X-Admin-Token hợp lệ"""
+    if not Config.ADMIN_TOKEN:
+        return jsonify({"ok": False, "error": "Chưa cấu hình ADMIN_TOKEN"}), 403
+    if request.headers.get("X-Admin-Token") != Config.ADMIN_TOKEN:
+        return jsonify({"ok": False, "error": "Sai X-Admin-Token"}), 403
+    return None
+
+
+@app.route("/admin/cache/stats", methods=["GET"])
+def cache_stats():
+    denied = _check_admin()
+    if denied:
+        return denied
+    return jsonify({"ok": True, "enabled": Config.CACHE_ENABLED, **response_cache.stats()})
+
+
+@app.route("/admin/cache/invalidate", methods=["POST"])
+def cache_invalidate():
+    denied = _check_admin()
+    if denied:
+        return denied
+    data = request.get_json(force=True, silent=True) or {}
+    route = data.get("route")
+    try:
+        removed = response_cache.invalidate(route)
+        return jsonify({"ok": True, "route": route, "removed": removed})
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+
+# -------------------------------------------------
+# ADMIN: ĐỒNG BỘ NEO4J -> MONGODB
+# -------------------------------------------------
+def _after_sync(result):
+    """
+    Dữ liệu mirror đã đổi: xóa cache, báo thread nền của worker này nạp lại index / snapshot.
+    Worker khác thấy finished_at mới trong sync_state (graph_sync.generation) và tự nạp lại.
+    """
+    response_cache.invalidate()
+    label_index.request_rebuild()
+    graph_snapshot.request_rebuild()
+
+
+@app.route("/admin/sync", methods=["POST"])
+def sync_start():
+    denied = _check_admin()
+    if denied:
+        return denied
+    data = request.get_json(force=True, silent=True) or {}
+    mode = data.get("mode", INCREMENTAL)
+    if mode not in (FULL, INCREMENTAL):
+        return jsonify({"ok": False, "error": f"mode phải là '{FULL}' hoặc '{INCREMENTAL}'"}), 400
+    try:
+        resume = pagination.parse_bool(data.get("resume"), True, "resume")
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    if not graph_sync.start(mode, resume=resume, on_done=_after_sync):
+        return jsonify({"ok": False, "error": "Đang có một lượt sync chạy (worker hoặc CLI khác)"}), 409
+    return jsonify({"ok": True, "started": True, "mode": mode}), 202
+
+
+@app.route("/admin/sync", methods=["GET"])
+def sync_status():
+    denied = _check_admin()
+    if denied:
+        return denied
+    try:
+        return json_response({"ok": True, **graph_sync.status()})
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
 
 
 # -------------------------------------------------
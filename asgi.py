@@ -0,0 +1,455 @@
+# asgi.py
+"""
+Chế độ async (ASGI) của API: cùng các route đọc dữ liệu chính như app.py nhưng dùng
+AsyncMongoClient + driver Neo4j async, nên một process xử lý được hàng trăm request
+đang chờ Atlas / Aura cùng lúc.
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker -w 2
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from clients.async_mongo_client import async_mongo_client
+from clients.async_neo4j_client import async_neo4j_client
+from clients.config import Config
+from services import fanout, metrics, pagination
+from services.cache import normalize_query, response_cache
+from services.graph_snapshot import graph_snapshot
+from services.health import health_prober
+from services.queries import (
+    NODES_CYPHER,
+    SEARCH_BY_IDS_CYPHER,
+    SEARCH_CYPHER,
+    SEARCH_NODES_BY_IDS_CYPHER,
+    SEARCH_NODES_CYPHER,
+    cacheable,
+    mongo_nodes_filter,
+    mongo_rels_filter,
+    neo4j_ids,
+    parse_max_rows,
+    search_flags,
+    search_response,
+    search_results,
+    snapshot_ready,
+    sort_by_ids,
+    with_relations,
+)
+from services.search_index import label_index
+from services.serializer import dumps, dumps_line
+
+
+def json_response(payload, status=200):
+    """Response JSON qua serializer chung (orjson nếu có)"""
+    return Response(dumps(payload), status_code=status, media_type="application/json")
+
+
+def _error(message, status):
+    return JSONResponse({"ok": False, "error": message}, status_code=status)
+
+
+async def _cached(route, params, ttl, compute):
+    """Gọi compute() (coroutine) qua response_cache; compute trả về (payload, status)"""
+    if not Config.CACHE_ENABLED:
+        payload, status = await compute()
+    else:
+        payload, status = await response_cache.aget_or_compute(route, params, ttl, compute, cacheable)
+    return json_response(payload, status)
+
+
+async def _collect(awaitable, deadline):
+    """Giống fanout.collect cho coroutine: trả về (result, error, timed_out)"""
+    try:
+        return await asyncio.wait_for(awaitable, fanout.remaining(deadline)), None, False
+    except asyncio.TimeoutError:
+        return None, "Quá thời gian chờ", True
+    except Exception as e:
+        return None, str(e), False
+
+
+# -------------------------------------------------
+# ROUTE KIỂM TRA / METRICS
+# -------------------------------------------------
+async def index(request):
+    """Trang kiểm tra nhanh"""
+    return JSONResponse({"message": "API Neo4j + MongoDB đang chạy (ASGI)"})
+
+
+async def prometheus_metrics(request):
+    if not Config.METRICS_ENABLED:
+        return _error("Metrics đang tắt", 404)
+    body = metrics.render(metrics.registry.collect())
+    return Response(body, media_type="text/plain; version=0.0.4")
+
+
+async def health(request):
+    # trạng thái do health_prober kiểm tra định kỳ; status() có thể probe ngay nên chạy trong thread
+    mongo, neo4j = await asyncio.gather(asyncio.to_thread(health_prober.status, "mongo"),
+                                        asyncio.to_thread(health_prober.status, "neo4j"))
+    return JSONResponse({"ok": mongo["ok"] and neo4j["ok"], "details": {"mongo": mongo, "neo4j": neo4j}})
+
+
+async def neo4j_health(request):
+    status = await asyncio.to_thread(health_prober.status, "neo4j")
+    if not status["ok"]:
+        return JSONResponse(status, status_code=500)
+    return JSONResponse({"ok": True, "data": status.get("result"),
+                         "latency_ms": status["latency_ms"], "checked_at": status["checked_at"]})
+
+
+# -------------------------------------------------
+# API MONGO: LẤY DỮ LIỆU (MẶC ĐỊNH DÙNG 'nodes')
+# -------------------------------------------------
+async def _ndjson_export(cursor, key, fields):
+    """
+    Xuất cursor dạng NDJSON, dòng cuối có token 'next' để chạy tiếp.
+    Mỗi lượt dừng sau MONGO_EXPORT_MAX_DOCS document / MONGO_EXPORT_MAX_SECONDS giây.
+    """
+    count, last, started = 0, None, time.monotonic()
+    try:
+        async for doc in cursor:
+            last = doc.get(key)
+            yield dumps_line(pagination.clean_doc(doc, fields))
+            count += 1
+            if count >= Config.MONGO_EXPORT_MAX_DOCS or time.monotonic() - started >= Config.MONGO_EXPORT_MAX_SECONDS:
+                yield dumps_line({"ok": True, "count": count, "next": pagination.encode_cursor(key, last)})
+                return
+    except Exception as e:
+        nxt = pagination.encode_cursor(key, last) if last is not None else None
+        yield dumps_line({"ok": False, "count": count, "next": nxt, "error": str(e)})
+        return
+    finally:
+        await cursor.close()
+    yield dumps_line({"ok": True, "count": count, "next": None})
+
+
+async def get_mongo_products(request):
+    args = request.query_params
+    collection_name = args.get("collection", "nodes")
+    key = args.get("key", "_id")
+    after_token = args.get("after", "")
+    export = args.get("export")
+
+    try:
+        limit = pagination.parse_int(args.get("limit"), 10, "limit", Config.MONGO_PAGE_MAX_LIMIT)
+        if key not in pagination.PAGE_KEYS:
+            raise ValueError(f"Tham số 'key' phải là một trong {list(pagination.PAGE_KEYS)}")
+        after = None
+        if after_token:
+            key, after = pagination.decode_cursor(after_token)
+        fields = pagination.parse_fields(args.get("fields"))
+        flt = pagination.parse_filter(args.get("filter"))
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    if key != "_id":
+        flt = {"$and": [flt, {key: {"$exists": True}}]} if flt else {key: {"$exists": True}}
+    query = pagination.page_query(flt, key, after)
+    projection = pagination.page_projection(fields, key)
+
+    # ========== EXPORT: STREAM TOÀN BỘ COLLECTION ==========
+    if export == "ndjson":
+        try:
+            col = async_mongo_client.get_collection(collection_name)
+            cursor = (col.find(query, projection)
+                      .sort(key, 1)
+                      .batch_size(Config.MONGO_EXPORT_BATCH_SIZE))
+        except Exception as e:
+            return _error(str(e), 500)
+        return StreamingResponse(_ndjson_export(cursor, key, fields), media_type="application/x-ndjson")
+
+    # ========== PHÂN TRANG KEYSET ==========
+    async def compute():
+        try:
+            col = async_mongo_client.get_collection(collection_name)
+            cursor = col.find(query, projection).sort(key, 1).limit(limit + 1)
+            data = await cursor.to_list()
+            nxt = None
+            if len(data) > limit:
+                data = data[:limit]
+                nxt = pagination.encode_cursor(key, data[-1][key])
+            data = [pagination.clean_doc(d, fields) for d in data]
+            return {"ok": True, "count": len(data), "data": data, "next": nxt}, 200
+        except Exception as e:
+            return {"ok": False, "error": str(e)}, 500
+
+    params = "|".join([collection_name, str(limit), key, after_token,
+                       ",".join(fields), args.get("filter", "")])
+    return await _cached("mongo_products", params, Config.CACHE_TTL_MONGO_PRODUCTS, compute)
+
+
+# -------------------------------------------------
+# API NEO4J: LẤY NODE / CHẠY CYPHER
+# -------------------------------------------------
+async def get_nodes(request):
+    try:
+        limit = pagination.parse_int(request.query_params.get("limit"), 20, "limit", Config.NEO4J_NODES_MAX_LIMIT)
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    async def compute():
+        try:
+            result = await async_neo4j_client.run_query(NODES_CYPHER, {"limit": limit}, raw=True, op="nodes")
+            data = [row["n"] for row in result]
+            return {"ok": True, "count": len(data), "data": data}, 200
+        except Exception as e:
+            return {"ok": False, "error": str(e)}, 500
+
+    return await _cached("neo4j_nodes", str(limit), Config.CACHE_TTL_NEO4J_NODES, compute)
+
+
+async def _ndjson_rows(first, result, max_rows):
+    """Ghi từng dòng NDJSON ngay khi chuyển đổi xong, dòng cuối là tổng kết"""
+    count, truncated = 0, False
+
+    async def rows():
+        if first is not None:
+            yield first
+        async for r in result:
+            yield r
+
+    try:
+        # kiểm tra max_rows trước mỗi dòng, kể cả dòng đầu (giống app.py)
+        async for r in rows():
+            if count >= max_rows:
+                truncated = True
+                break
+            yield dumps_line(r)
+            count += 1
+    except Exception as e:
+        yield dumps_line({"ok": False, "count": count, "error": str(e)})
+        return
+    finally:
+        await result.aclose()
+    yield dumps_line({"ok": True, "count": count, "truncated": truncated})
+
+
+async def run_neo4j_query(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    data = data if isinstance(data, dict) else {}
+    query = data.get("query")
+    params = data.get("params") or {}
+    stream = request.query_params.get("stream") or data.get("stream")
+
+    if not query:
+        return _error("Thiếu 'query' trong body", 400)
+    try:
+        max_rows = parse_max_rows(data.get("max_rows"))
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    result = async_neo4j_client.stream_query(query, params, raw=True, op="adhoc")
+    try:
+        # lấy dòng đầu tiên trước để lỗi cú pháp / kết nối vẫn trả về mã 500
+        first = await anext(result, None)
+    except Exception as e:
+        return _error(str(e), 500)
+
+    if stream == "ndjson":
+        return StreamingResponse(_ndjson_rows(first, result, max_rows), media_type="application/x-ndjson")
+
+    try:
+        rows, truncated = ([] if first is None else [first]), False
+        try:
+            async for r in result:
+                if len(rows) >= max_rows:
+                    truncated = True
+                    break
+                rows.append(r)
+        finally:
+            # trả session về pool cả khi đọc dòng bị lỗi (giống _ndjson_rows)
+            await result.aclose()
+
+        return json_response({"ok": True, "count": len(rows), "truncated": truncated, "data": rows})
+    except Exception as e:
+        return _error(str(e), 500)
+
+
+# -------------------------------------------------
+# API SEARCH CHO CHATBOT
+# -------------------------------------------------
+# label_index / graph_snapshot là tra cứu CPU trong bộ nhớ: chạy bằng asyncio.to_thread
+# để không chặn event loop khi index / snapshot lớn
+async def _search_rows(cypher, nodes_cypher, params, timeout, op):
+    """Chạy Cypher tìm kiếm; dùng graph_snapshot cho quan hệ thay vì OPTIONAL MATCH nếu có"""
+    if snapshot_ready():
+        rows = await async_neo4j_client.run_query(nodes_cypher, params, timeout=timeout, op=op)
+        return await asyncio.to_thread(with_relations, rows)
+    return await async_neo4j_client.run_query(cypher, params, timeout=timeout, op=op)
+
+
+async def _search_neo4j(q, timeout):
+    """Tìm node trong Neo4j theo rdfs__label"""
+    return search_results(await _search_rows(SEARCH_CYPHER, SEARCH_NODES_CYPHER, {"q": q}, timeout, "search"))
+
+
+async def _search_neo4j_by_ids(ids, timeout):
+    """Lấy node trong Neo4j theo id đã tìm được từ label_index (giữ thứ hạng)"""
+    if not ids:
+        return []
+    rows = await _search_rows(SEARCH_BY_IDS_CYPHER, SEARCH_NODES_BY_IDS_CYPHER,
+                              {"ids": neo4j_ids(ids)}, timeout, "search_ids")
+    return search_results(rows)
+
+
+async def _search_mongo_nodes(q, max_time_ms):
+    """Tìm node trong mongo theo props.rdfs__label hoặc labels"""
+    nodes_coll = async_mongo_client.get_collection("nodes")
+    return await nodes_coll.find(mongo_nodes_filter(q), {"_id": 0}).max_time_ms(max_time_ms).to_list()
+
+
+async def _search_mongo_nodes_by_ids(ids, max_time_ms):
+    """Lấy node trong mongo theo neo4j_id (truy vấn theo khóa, giữ thứ hạng)"""
+    if not ids:
+        return []
+    nodes_coll = async_mongo_client.get_collection("nodes")
+    docs = await nodes_coll.find({"neo4j_id": {"$in": ids}}, {"_id": 0}).max_time_ms(max_time_ms).to_list()
+    return sort_by_ids(docs, ids)
+
+
+async def _search_mongo_rels(neo_ids, max_time_ms):
+    """Tìm rel trong mongo nối với các node đã tìm được"""
+    rels_coll = async_mongo_client.get_collection("rels")
+    rel_ids = None
+    if snapshot_ready():
+        rel_ids = await asyncio.to_thread(graph_snapshot.edge_ids, neo_ids)
+        if not rel_ids:
+            return []
+    return await rels_coll.find(mongo_rels_filter(neo_ids, rel_ids), {"_id": 0}).max_time_ms(max_time_ms).to_list()
+
+
+async def _fanout_search(neo4j_call, nodes_call):
+    """Giống _fanout_search trong app.py nhưng chạy trên event loop thay vì thread pool"""
+    timed_out = []
+    neo4j_deadline = fanout.deadline_after(Config.SEARCH_NEO4J_TIMEOUT)
+    mongo_deadline = fanout.deadline_after(Config.SEARCH_MONGO_TIMEOUT)
+    mongo_ms = max(1, int(Config.SEARCH_MONGO_TIMEOUT * 1000))
+
+    async def mongo():
+        # ========== MONGODB: NODES -> RELS ==========
+        nodes, error, late = await _collect(nodes_call(mongo_ms), mongo_deadline)
+        nodes, rels = nodes or [], []
+        neo_ids = [n.get("neo4j_id") for n in nodes if "neo4j_id" in n]
+        if neo_ids:
+            left_ms = int(fanout.remaining(mongo_deadline) * 1000)
+            if left_ms > 0:
+                rels, error, late = await _collect(_search_mongo_rels(neo_ids, left_ms), mongo_deadline)
+                rels = rels or []
+            else:
+                error, late = "Quá thời gian chờ", True
+        return nodes, rels, error, late
+
+    # ========== GỬI SONG SONG NEO4J + MONGO ==========
+    (neo4j_results, neo4j_error, neo4j_timed_out), (mongo_nodes, mongo_rels, mongo_error, mongo_timed_out) = \
+        await asyncio.gather(_collect(neo4j_call(Config.SEARCH_NEO4J_TIMEOUT), neo4j_deadline), mongo())
+    if mongo_timed_out:
+        timed_out.append("mongo")
+    if neo4j_timed_out:
+        timed_out.append("neo4j")
+    return neo4j_results or [], mongo_nodes, mongo_rels, search_flags(neo4j_error, mongo_error, timed_out)
+
+
+async def _search_payload(q):
+    """Chạy tìm kiếm trên Neo4j + MongoDB, trả về (payload, status)"""
+    if Config.SEARCH_INDEX_ENABLED and label_index.ready:
+        ids = await asyncio.to_thread(label_index.search, q, Config.SEARCH_RESULT_LIMIT)
+        neo4j_results, mongo_nodes, mongo_rels, flags = await _fanout_search(
+            lambda timeout: _search_neo4j_by_ids(ids, timeout),
+            lambda ms: _search_mongo_nodes_by_ids(ids, ms),
+        )
+    else:
+        neo4j_results, mongo_nodes, mongo_rels, flags = await _fanout_search(
+            lambda timeout: _search_neo4j(q, timeout),
+            lambda ms: _search_mongo_nodes(q, ms),
+        )
+
+    return search_response(q, neo4j_results, mongo_nodes, mongo_rels, flags)
+
+
+async def search(request):
+    q = request.query_params.get("query", "").strip()
+    if not q:
+        return _error("Thiếu tham số ?query=", 400)
+
+    return await _cached("search", normalize_query(q), Config.CACHE_TTL_SEARCH,
+                         lambda: _search_payload(q))
+
+
+# -------------------------------------------------
+# KHỞI TẠO APP ASGI
+# -------------------------------------------------
+@asynccontextmanager
+async def lifespan(app):
+    # health_prober / label_index / graph_snapshot vẫn dùng client đồng bộ trong thread nền
+    health_prober.ensure_started()
+    if Config.SEARCH_INDEX_ENABLED:
+        label_index.ensure_started()
+    if Config.GRAPH_SNAPSHOT_ENABLED:
+        graph_snapshot.ensure_started()
+    yield
+    if async_neo4j_client.initialized:
+        await async_neo4j_client.close()
+    if async_mongo_client.initialized:
+        await async_mongo_client.close()
+
+
+class _RequestTimer:
+    """Middleware ASGI đo thời gian từng request (cùng metric với app.py), gồm cả thời gian stream body"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not Config.METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+        started, status, sent = time.perf_counter(), {}, [0]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                sent[0] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # các route ở đây không có tham số đường dẫn nên path chính là route
+            route = scope["path"] if "endpoint" in scope else "unmatched"
+            metrics.registry.observe("http_request_duration_seconds", {
+                "route": route,
+                "method": scope["method"],
+                "status": status.get("code", 500),
+            }, time.perf_counter() - started)
+            if sent[0]:
+                metrics.registry.inc("http_response_bytes_total", {"route": route}, sent[0])
+
+
+app = Starlette(
+    routes=[
+        Route("/", index),
+        Route("/metrics", prometheus_metrics),
+        Route("/health", health),
+        Route("/neo4j/health", neo4j_health),
+        Route("/mongo/products", get_mongo_products),
+        Route("/products", get_mongo_products),
+        Route("/neo4j/nodes", get_nodes),
+        Route("/neo4j/query", run_neo4j_query, methods=["POST"]),
+        Route("/search", search),
+    ],
+    middleware=[
+        Middleware(_RequestTimer),
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+    ],
+    lifespan=lifespan,
+)
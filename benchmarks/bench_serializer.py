@@ -0,0 +1,93 @@
+# benchmarks/bench_serializer.py
+"""
+So sánh serializer chung (services.serializer) với đường cũ
+(convert_value + jsonify mặc định của Flask) trên kết quả 10k dòng.
+
+    python -m benchmarks.bench_serializer --rows 10000 --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from neo4j.graph import Node, Relationship
+
+from benchmarks.graph import fruit_graph
+from clients.config import Config
+from services import serializer
+
+
+def legacy_convert_value(v):
+    """Bản sao convert_value cũ trong app.py (trước khi gộp serializer)"""
+    if isinstance(v, Node):
+        return {
+            "id": v.id,
+            "labels": list(v.labels),
+            "properties": dict(v),
+        }
+    if isinstance(v, Relationship):
+        return {
+            "id": v.id,
+            "type": v.type,
+            "start_node_id": v.start_node.id,
+            "end_node_id": v.end_node.id,
+            "properties": dict(v),
+        }
+    if isinstance(v, dict):
+        return v
+    return v
+
+
+def make_rows(count):
+    nodes, rels = fruit_graph(count)
+    rows = []
+    for i in range(count):
+        r = rels[i % len(rels)]
+        rows.append({"n": r.start_node, "r": r, "m": r.end_node, "score": i / count})
+    return rows
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        size = len(fn())
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    app = Flask(__name__)
+    provider = DefaultJSONProvider(app)
+
+    def legacy():
+        converted = [{k: legacy_convert_value(v) for k, v in r.items()} for r in rows]
+        return provider.dumps({"ok": True, "count": len(converted), "data": converted})
+
+    def unified(backend):
+        def run():
+            Config.JSON_BACKEND = backend
+            return serializer.dumps({"ok": True, "count": len(rows), "data": rows})
+        return run
+
+    cases = [("legacy convert_value + jsonify", legacy), ("serializer (json)", unified("json"))]
+    if serializer.orjson is not None:
+        cases.append(("serializer (orjson)", unified("auto")))
+
+    print(f"{args.rows} dòng, median của {args.repeat} lần")
+    base = None
+    for name, fn in cases:
+        sec, size = timed(fn, args.repeat)
+        base = base or sec
+        print(f"  {name:<34} {sec * 1000:8.1f} ms  {size / 1024:8.0f} KiB  x{base / sec:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,547 @@
+# benchmarks/fakes.py
+"""
+Bản giả lập MongoDB và driver Neo4j trong bộ nhớ để chạy benchmark offline
+(không gọi Atlas / Aura). Chỉ hỗ trợ các truy vấn mà app.py đang dùng.
+"""
+import asyncio
+import copy
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from neo4j.graph import Node, Relationship
+
+from benchmarks.graph import fruit_graph
+
+_MISSING = object()
+
+
+# -------------------------------------------------
+# MONGODB GIẢ LẬP
+# -------------------------------------------------
+def _get_path(doc: Any, path: str) -> Any:
+    for part in path.split("."):
+        if isinstance(doc, dict) and part in doc:
+            doc = doc[part]
+        else:
+            return _MISSING
+    return doc
+
+
+def _compare(op: str, value: Any, arg: Any) -> bool:
+    try:
+        if op == "$gt":
+            return value > arg
+        if op == "$gte":
+            return value >= arg
+        if op == "$lt":
+            return value < arg
+        if op == "$lte":
+            return value <= arg
+    except TypeError:
+        return False
+    raise ValueError(f"Fake Mongo không hỗ trợ toán tử {op}")
+
+
+def _match_value(value: Any, cond: Any) -> bool:
+    candidates = value if isinstance(value, list) else [value]
+    if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+        for op, arg in cond.items():
+            if op == "$options":
+                continue
+            if op == "$exists":
+                ok = (value is not _MISSING) == bool(arg)
+            elif op == "$regex":
+                flags = re.IGNORECASE if "i" in cond.get("$options", "") else 0
+                ok = any(isinstance(c, str) and re.search(arg, c, flags) for c in candidates)
+            elif op == "$in":
+                ok = any(c in arg for c in candidates)
+            elif op == "$nin":
+                ok = not any(c in arg for c in candidates)
+            elif op == "$eq":
+                ok = _match_value(value, arg)
+            elif op == "$ne":
+                ok = not _match_value(value, arg)
+            elif op == "$elemMatch":
+                ok = isinstance(value, list) and any(
+                    _match_value(c, arg) if all(k.startswith("$") for k in arg) else match(c, arg)
+                    for c in value
+                )
+            else:
+                ok = any(c is not _MISSING and _compare(op, c, arg) for c in candidates)
+            if not ok:
+                return False
+        return True
+    if cond is None and value is _MISSING:
+        return True
+    return value == cond or (isinstance(value, list) and cond in value)
+
+
+def match(doc: Dict[str, Any], flt: Dict[str, Any]) -> bool:
+    """Kiểm tra document có khớp filter Mongo (tập con) hay không"""
+    for key, cond in flt.items():
+        if key == "$or":
+            if not any(match(doc, f) for f in cond):
+                return False
+        elif key == "$and":
+            if not all(match(doc, f) for f in cond):
+                return False
+        elif not _match_value(_get_path(doc, key), cond):
+            return False
+    return True
+
+
+def _project(doc: Dict[str, Any], projection: Dict[str, Any] | None) -> Dict[str, Any]:
+    if not projection:
+        return copy.deepcopy(doc)
+    include = [k for k, v in projection.items() if v and k != "_id"]
+    if include:
+        out: Dict[str, Any] = {}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        for path in include:
+            value = _get_path(doc, path)
+            if value is _MISSING:
+                continue
+            target = out
+            parts = path.split(".")
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = copy.deepcopy(value)
+        return out
+    out = copy.deepcopy(doc)
+    for k, v in projection.items():
+        if not v:
+            out.pop(k, None)
+    return out
+
+
+class FakeCursor:
+    def __init__(self, collection: "FakeCollection", flt, projection) -> None:
+        self._collection = collection
+        self._filter = flt or {}
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._limit = 0
+
+    def sort(self, key, direction: int = 1) -> "FakeCursor":
+        self._sort = list(key) if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def limit(self, n: int) -> "FakeCursor":
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int) -> "FakeCursor":
+        return self
+
+    def max_time_ms(self, ms: int) -> "FakeCursor":
+        return self
+
+    def close(self) -> None:
+        pass
+
+    def __iter__(self):
+        self._collection.wait()
+        return self._results()
+
+    def _results(self):
+        docs = [d for d in self._collection.docs if match(d, self._filter)]
+        for key, direction in reversed(self._sort):
+            docs.sort(key=lambda d: (_get_path(d, key) is _MISSING, _get_path(d, key)),
+                      reverse=direction < 0)
+        if self._limit:
+            docs = docs[:self._limit]
+        for d in docs:
+            yield _project(d, self._projection)
+
+
+class FakeCollection:
+    def __init__(self, name: str, latency: float = 0.0) -> None:
+        self.name = name
+        self.latency = latency
+        self.docs: List[Dict[str, Any]] = []
+
+    def wait(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    def insert_many(self, docs: Iterable[Dict[str, Any]]) -> None:
+        for d in docs:
+            d.setdefault("_id", ObjectId())
+            self.docs.append(d)
+
+    def find(self, flt=None, projection=None) -> FakeCursor:
+        return FakeCursor(self, flt, projection)
+
+    # ---------- GHI (cho services/sync.py) ----------
+    def find_one(self, flt=None) -> Dict[str, Any] | None:
+        return next(iter(self.find(flt)), None)
+
+    def create_index(self, keys, **options) -> str:
+        return "_".join(f"{k}_{d}" for k, d in keys)
+
+    def replace_one(self, flt, doc, upsert: bool = False) -> None:
+        for i, d in enumerate(self.docs):
+            if match(d, flt):
+                self.docs[i] = {"_id": d["_id"], **doc}
+                return
+        if upsert:
+            self.insert_many([dict(doc)])
+
+    def update_one(self, flt, update, upsert: bool = False) -> SimpleNamespace:
+        doc = self._find_raw(flt)
+        if doc is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0, modified_count=0)
+            doc = {k: v for k, v in flt.items() if not k.startswith("$")}
+            if "_id" in doc and any(d["_id"] == doc["_id"] for d in self.docs):
+                raise DuplicateKeyError("E11000 duplicate key error")
+            self.insert_many([doc])
+            doc.update(copy.deepcopy(update.get("$set", {})))
+            return SimpleNamespace(matched_count=0, modified_count=0)
+        doc.update(copy.deepcopy(update.get("$set", {})))
+        return SimpleNamespace(matched_count=1, modified_count=1)
+
+    def find_one_and_update(self, flt, update, upsert: bool = False) -> Dict[str, Any] | None:
+        self.update_one(flt, update, upsert=upsert)
+        return self.find_one({"_id": flt["_id"]}) if "_id" in flt else None
+
+    def _find_raw(self, flt) -> Dict[str, Any] | None:
+        return next((d for d in self.docs if match(d, flt)), None)
+
+    def bulk_write(self, ops, ordered: bool = True) -> SimpleNamespace:
+        """Chỉ hỗ trợ UpdateOne({key: value}, {"$set": ...}, upsert=...)"""
+        self.wait()
+        by_key: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        for d in self.docs:
+            for k, v in d.items():
+                if k != "_id" and not isinstance(v, (dict, list)):
+                    by_key.setdefault((k, v), d)
+        upserted = modified = 0
+        for op in ops:
+            (key, value), = op._filter.items()
+            doc = by_key.get((key, value))
+            if doc is None:
+                if not op._upsert:
+                    continue
+                doc = {key: value}
+                self.insert_many([doc])
+                by_key[(key, value)] = doc
+                upserted += 1
+            else:
+                modified += 1
+            doc.update(copy.deepcopy(op._doc["$set"]))
+        return SimpleNamespace(upserted_count=upserted, modified_count=modified)
+
+    def delete_many(self, flt) -> SimpleNamespace:
+        keep = [d for d in self.docs if not match(d, flt)]
+        deleted = len(self.docs) - len(keep)
+        self.docs[:] = keep
+        return SimpleNamespace(deleted_count=deleted)
+
+
+class FakeDatabase:
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name, self.latency)
+        return self._collections[name]
+
+    def list_collection_names(self) -> List[str]:
+        time.sleep(self.latency)
+        return list(self._collections)
+
+
+class _FakeAdmin:
+    def command(self, name: str) -> Dict[str, Any]:
+        return {"ok": 1.0}
+
+
+class FakeMongoClient:
+    def __init__(self, latency: float = 0.0) -> None:
+        self.admin = _FakeAdmin()
+        self._db = FakeDatabase(latency)
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        return self._db
+
+    def close(self) -> None:
+        pass
+
+
+# -------------------------------------------------
+# NEO4J GIẢ LẬP
+# -------------------------------------------------
+def _data_value(v: Any) -> Any:
+    """Giống record.data() của driver: Node -> dict thuộc tính"""
+    if isinstance(v, Node):
+        return dict(v)
+    if isinstance(v, Relationship):
+        return dict(v.start_node), v.type, dict(v.end_node)
+    return v
+
+
+class FakeRecord:
+    def __init__(self, keys: List[str], values: List[Any]) -> None:
+        self._keys = keys
+        self._values = values
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    def values(self) -> List[Any]:
+        return list(self._values)
+
+    def data(self) -> Dict[str, Any]:
+        return {k: _data_value(v) for k, v in zip(self._keys, self._values)}
+
+
+class FakeResult:
+    def __init__(self, keys: List[str], rows: List[List[Any]]) -> None:
+        self._keys = keys
+        self._rows = rows
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    def __iter__(self):
+        for row in self._rows:
+            yield FakeRecord(self._keys, row)
+
+    def consume(self) -> None:
+        return None
+
+
+class FakeSession:
+    def __init__(self, driver: "FakeNeo4jDriver") -> None:
+        self._driver = driver
+
+    def __enter__(self) -> "FakeSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def run(self, query, params=None) -> FakeResult:
+        text = getattr(query, "text", query)
+        return self._driver.execute(text, params or {})
+
+    def execute_read(self, work, *args, **kwargs):
+        # transaction giả: tx.run giống session.run
+        return work(self, *args, **kwargs)
+
+
+Handler = Callable[[Dict[str, Any]], Tuple[List[str], List[List[Any]]]]
+
+
+class FakeNeo4jDriver:
+    """
+    Driver Neo4j giả: mỗi truy vấn được so với danh sách (regex, handler),
+    handler trả về (keys, rows) gồm Node / Relationship tổng hợp.
+    """
+
+    def __init__(self, nodes: List[Node], rels: List[Relationship], latency: float = 0.0) -> None:
+        self.latency = latency
+        self.nodes = nodes
+        self.rels = rels
+        self.by_id = {n.id: n for n in nodes}
+        self.out: Dict[int, List[Relationship]] = {}
+        for r in rels:
+            self.out.setdefault(r.start_node.id, []).append(r)
+        self.handlers: List[Tuple[re.Pattern, Handler]] = [
+            (re.compile(r"RETURN 1 AS ok"), lambda p: (["ok"], [[1]])),
+            (re.compile(r"CONTAINS toLower\(\$q\)"), self._search_contains),
+            (re.compile(r"id\(n\) = \$ids\[i\]"), self._search_ids),
+            (re.compile(r"UNWIND \$terms AS term"), self._search_terms),
+            (re.compile(r"MATCH \(n\) RETURN n LIMIT"), self._nodes),
+            (re.compile(r"RETURN timestamp\(\) AS ts"), lambda p: (["ts"], [[int(time.time() * 1000)]])),
+            (re.compile(r"RETURN id\(n\) AS id, labels\(n\)"), self._sync_nodes),
+            (re.compile(r"RETURN id\(r\) AS id, type\(r\)"), self._sync_rels),
+        ]
+
+    def session(self, **kwargs) -> FakeSession:
+        return FakeSession(self)
+
+    def close(self) -> None:
+        pass
+
+    def execute(self, text: str, params: Dict[str, Any]) -> FakeResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self.dispatch(text, params)
+
+    def dispatch(self, text: str, params: Dict[str, Any]) -> FakeResult:
+        for pattern, handler in self.handlers:
+            if pattern.search(text):
+                keys, rows = handler(params)
+                return FakeResult(keys, rows)
+        return FakeResult(*self._paths(params))
+
+    # ---------- HANDLER ----------
+    def _search_row(self, n: Node) -> List[Any]:
+        node = {**dict(n), "label": n.get("rdfs__label"), "labels": list(n.labels)}
+        relations = [{
+            "type": r.type,
+            "target_label": r.end_node.get("rdfs__label", ""),
+            "target_labels": list(r.end_node.labels),
+        } for r in self.out.get(n.id, [])]
+        return [node, relations]
+
+    def _search_contains(self, params):
+        q = str(params.get("q", "")).lower()
+        rows = [[n.id] + self._search_row(n) for n in self.nodes
+                if q in str(n.get("rdfs__label", "")).lower()]
+        return ["nid", "node", "relations"], rows
+
+    def _search_ids(self, params):
+        rows = [[i] + self._search_row(self.by_id[i]) for i in params.get("ids", []) if i in self.by_id]
+        return ["nid", "node", "relations"], rows
+
+    def _search_terms(self, params):
+        rows = []
+        for term in params.get("terms", []):
+            t = str(term).lower()
+            rows.extend([term, n.id] + self._search_row(n) for n in self.nodes
+                        if t in str(n.get("rdfs__label", "")).lower())
+        return ["term", "nid", "node", "relations"], rows
+
+    def _nodes(self, params):
+        return ["n"], [[n] for n in self.nodes[:params.get("limit", 20)]]
+
+    @staticmethod
+    def _changed(entity, params) -> bool:
+        since = params.get("since")
+        return since is None or (entity.get(params.get("prop")) or 0) >= since
+
+    def _sync_nodes(self, params):
+        rows = [[n.id, list(n.labels), dict(n)] for n in sorted(self.nodes, key=lambda n: n.id)
+                if n.id > params["after"] and self._changed(n, params)]
+        return ["id", "labels", "props"], rows
+
+    def _sync_rels(self, params):
+        rows = [[r.id, r.type, r.start_node.id, r.end_node.id, dict(r)]
+                for r in sorted(self.rels, key=lambda r: r.id)
+                if r.id > params["after"] and self._changed(r, params)]
+        return ["id", "type", "start", "end", "props"], rows
+
+    def _paths(self, params):
+        """Truy vấn bất kỳ: trả về các bộ (n, r, m)"""
+        limit = params.get("limit", 100)
+        return ["n", "r", "m"], [[r.start_node, r, r.end_node] for r in self.rels[:limit]]
+
+
+# -------------------------------------------------
+# BẢN ASYNC (cho asgi.py): dùng chung dữ liệu, độ trễ bằng asyncio.sleep
+# -------------------------------------------------
+class AsyncFakeCursor(FakeCursor):
+    async def to_list(self, length: int | None = None) -> List[Dict[str, Any]]:
+        await asyncio.sleep(self._collection.latency)
+        docs = list(self._results())
+        return docs[:length] if length else docs
+
+    async def __aiter__(self):
+        await asyncio.sleep(self._collection.latency)
+        for d in self._results():
+            yield d
+
+    async def close(self) -> None:
+        pass
+
+
+class AsyncFakeCollection:
+    def __init__(self, collection: FakeCollection) -> None:
+        self._collection = collection
+
+    def find(self, flt=None, projection=None) -> AsyncFakeCursor:
+        return AsyncFakeCursor(self._collection, flt, projection)
+
+
+class AsyncFakeDatabase:
+    def __init__(self, db: FakeDatabase) -> None:
+        self._db = db
+
+    def __getitem__(self, name: str) -> AsyncFakeCollection:
+        return AsyncFakeCollection(self._db[name])
+
+
+class AsyncFakeMongoClient:
+    """AsyncMongoClient giả, đọc cùng dữ liệu với một FakeMongoClient"""
+
+    def __init__(self, sync_client: FakeMongoClient) -> None:
+        self._sync = sync_client
+
+    def __getitem__(self, name: str) -> AsyncFakeDatabase:
+        return AsyncFakeDatabase(self._sync[name])
+
+    async def close(self) -> None:
+        pass
+
+
+class AsyncFakeResult(FakeResult):
+    async def __aiter__(self):
+        for row in self._rows:
+            yield FakeRecord(self._keys, row)
+
+    async def consume(self) -> None:
+        return None
+
+
+class AsyncFakeSession:
+    def __init__(self, driver: FakeNeo4jDriver) -> None:
+        self._driver = driver
+
+    async def __aenter__(self) -> "AsyncFakeSession":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+    async def run(self, query, params=None) -> AsyncFakeResult:
+        if self._driver.latency:
+            await asyncio.sleep(self._driver.latency)
+        result = self._driver.dispatch(getattr(query, "text", query), params or {})
+        return AsyncFakeResult(result.keys(), result._rows)
+
+
+class AsyncFakeNeo4jDriver:
+    """AsyncDriver giả, dùng chung handler với một FakeNeo4jDriver"""
+
+    def __init__(self, sync_driver: FakeNeo4jDriver) -> None:
+        self._sync = sync_driver
+
+    def session(self, **kwargs) -> AsyncFakeSession:
+        return AsyncFakeSession(self._sync)
+
+    async def close(self) -> None:
+        pass
+
+
+# -------------------------------------------------
+# DỮ LIỆU TỔNG HỢP
+# -------------------------------------------------
+def fruit_backends(size: int, mongo_latency: float = 0.0, neo4j_latency: float = 0.0,
+                   seed: int = 42) -> Tuple[FakeMongoClient, FakeNeo4jDriver]:
+    """Sinh đồ thị trái cây rồi nạp vào cả Mongo giả (nodes / rels) lẫn Neo4j giả"""
+    nodes, rels = fruit_graph(size, seed=seed)
+    mongo = FakeMongoClient(mongo_latency)
+    db = mongo["fruit_graph"]
+    db["nodes"].insert_many({
+        "neo4j_id": n.id,
+        "labels": list(n.labels),
+        "props": dict(n),
+    } for n in nodes)
+    db["rels"].insert_many({
+        "neo4j_id": r.id,
+        "type": r.type,
+        "start_neo4j_id": r.start_node.id,
+        "end_neo4j_id": r.end_node.id,
+        "props": dict(r),
+    } for r in rels)
+    return mongo, FakeNeo4jDriver(nodes, rels, neo4j_latency)
@@ -0,0 +1,53 @@
+# benchmarks/graph.py
+"""Dựng Node / Relationship giả lập của driver neo4j cho benchmark"""
+import random
+from typing import Any, Dict, List, Tuple
+
+from neo4j.graph import Graph, Node, Relationship
+
+FRUITS = ["Sầu riêng", "Xoài cát Hòa Lộc", "Cam sành", "Chuối", "Đu đủ", "Mãng cầu",
+          "Thanh long", "Bưởi da xanh", "Măng cụt", "Chôm chôm", "Nhãn lồng", "Vải thiều"]
+REGIONS = ["Tiền Giang", "Bến Tre", "Đồng Tháp", "Vĩnh Long", "Hưng Yên", "Bắc Giang", "Bình Thuận"]
+USES = ["Ăn tươi", "Làm sinh tố", "Làm mứt", "Sấy khô", "Làm bánh"]
+REL_TYPES = ["GROWN_IN", "HAS_USE", "SIMILAR_TO"]
+
+
+def make_node(graph: Graph, node_id: int, labels: List[str], props: Dict[str, Any]) -> Node:
+    node = Node(graph, str(node_id), node_id, labels, props)
+    graph._nodes[str(node_id)] = node
+    return node
+
+
+def make_relationship(graph: Graph, rel_id: int, rel_type: str, start: Node, end: Node,
+                      props: Dict[str, Any] | None = None) -> Relationship:
+    rel = graph.relationship_type(rel_type)(graph, str(rel_id), rel_id, props or {})
+    rel._start_node = start
+    rel._end_node = end
+    graph._relationships[str(rel_id)] = rel
+    return rel
+
+
+def fruit_graph(size: int, seed: int = 42) -> Tuple[List[Node], List[Relationship]]:
+    """Đồ thị trái cây tổng hợp: `size` node trái cây + vùng trồng + công dụng"""
+    rnd = random.Random(seed)
+    graph = Graph()
+    nodes: List[Node] = []
+    rels: List[Relationship] = []
+
+    def add(labels, label):
+        n = make_node(graph, len(nodes), ["Resource"] + labels, {
+            "uri": f"http://example.org/fruit#{len(nodes)}",
+            "rdfs__label": label,
+        })
+        nodes.append(n)
+        return n
+
+    regions = [add(["Region"], r) for r in REGIONS]
+    uses = [add(["Use"], u) for u in USES]
+    fruits = [add(["Fruit"], f"{rnd.choice(FRUITS)} {i}") for i in range(size)]
+    for f in fruits:
+        rels.append(make_relationship(graph, len(rels), "GROWN_IN", f, rnd.choice(regions)))
+        rels.append(make_relationship(graph, len(rels), "HAS_USE", f, rnd.choice(uses)))
+        if rnd.random() < 0.3:
+            rels.append(make_relationship(graph, len(rels), "SIMILAR_TO", f, rnd.choice(fruits)))
+    return nodes, rels
@@ -0,0 +1,254 @@
+# benchmarks/replay.py
+"""
+Chạy app với MongoDB / Neo4j giả lập rồi phát lại log request ở concurrency cố định,
+in throughput và độ trễ p50 / p95 / p99 theo từng route.
+
+    python -m benchmarks.replay --nodes 5000 --concurrency 16 --requests 2000 \\
+        --log requests.jsonl --mongo-latency-ms 3 --neo4j-latency-ms 8
+
+    # chế độ async (asgi.py), cần cài thêm httpx
+    python -m benchmarks.replay --asgi --concurrency 200
+
+Mỗi dòng của log (định dạng requests.jsonl) là một request:
+    {"method": "GET", "path": "/search", "query": {"query": "xoài"}}
+    {"method": "POST", "path": "/neo4j/query", "json": {"query": "...", "params": {}}}
+Nếu file log không có hoặc rỗng, một bộ request tổng hợp sẽ được sinh ra.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from benchmarks.fakes import fruit_backends
+from benchmarks.graph import FRUITS, REGIONS
+
+
+ASGI_ROUTES = {"/search", "/neo4j/query", "/neo4j/nodes", "/mongo/products", "/products"}
+
+
+def boot_app(nodes: int, mongo_latency: float, neo4j_latency: float,
+             cache: bool, index: bool, snapshot: bool = True, asgi: bool = False):
+    """
+    Gắn các backend giả lập vào mongo_client / neo4j_client rồi mới import app,
+    để việc import không bao giờ tạo kết nối tới Atlas / Aura thật (chạy được offline).
+    asgi=True: trả về app ASGI (asgi.py) với client async giả dùng chung dữ liệu.
+    """
+    from benchmarks.fakes import AsyncFakeMongoClient, AsyncFakeNeo4jDriver
+    from clients.config import Config
+    from clients.mongo_client import MongoClientWrapper, mongo_client
+    from clients.neo4j_client import Neo4jClient, neo4j_client
+    from services.graph_snapshot import graph_snapshot
+    from services.search_index import label_index
+
+    mongo, driver = fruit_backends(nodes, mongo_latency, neo4j_latency)
+    mongo_client.override(MongoClientWrapper(client=mongo, db_name="fruit_graph"))
+    neo4j_client.override(Neo4jClient(driver=driver))
+    if asgi:
+        from clients.async_mongo_client import AsyncMongoClientWrapper, async_mongo_client
+        from clients.async_neo4j_client import AsyncNeo4jClient, async_neo4j_client
+        async_mongo_client.override(AsyncMongoClientWrapper(client=AsyncFakeMongoClient(mongo),
+                                                            db_name="fruit_graph"))
+        async_neo4j_client.override(AsyncNeo4jClient(driver=AsyncFakeNeo4jDriver(driver)))
+
+    import app as app_module
+
+    Config.CACHE_ENABLED = cache
+    Config.SEARCH_INDEX_ENABLED = index
+    if index:
+        label_index.ensure_started()
+        while not label_index.ready:
+            time.sleep(0.05)
+    Config.GRAPH_SNAPSHOT_ENABLED = snapshot
+    if snapshot:
+        graph_snapshot.ensure_started()
+        while not graph_snapshot.ready:
+            time.sleep(0.05)
+    if asgi:
+        import asgi as asgi_module
+        return asgi_module.app
+    return app_module.app
+
+
+def synthetic_requests(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Bộ request giống lưu lượng chatbot: chủ yếu /search, kèm vài truy vấn khác"""
+    rnd = random.Random(seed)
+    words = [w for name in FRUITS + REGIONS for w in name.split()]
+    mix = [
+        (0.6, lambda: {"method": "GET", "path": "/search",
+                       "query": {"query": rnd.choice(FRUITS + words)}}),
+        (0.15, lambda: {"method": "POST", "path": "/neo4j/query",
+                        "json": {"query": "MATCH (n)-[r]->(m) RETURN n, r, m LIMIT $limit",
+                                 "params": {"limit": rnd.choice([10, 100, 500])}}}),
+        (0.15, lambda: {"method": "GET", "path": "/mongo/products",
+                        "query": {"limit": rnd.choice([10, 50, 200]),
+                                  "collection": rnd.choice(["nodes", "rels"])}}),
+        (0.05, lambda: {"method": "GET", "path": "/neo4j/nodes",
+                        "query": {"limit": rnd.choice([20, 100])}}),
+        (0.05, lambda: {"method": "GET", "path": "/graph/neighbors",
+                        "query": {"id": rnd.randrange(50), "depth": rnd.choice([1, 2, 3])}}),
+    ]
+    out = []
+    for _ in range(count):
+        x, acc = rnd.random(), 0.0
+        for weight, make in mix:
+            acc += weight
+            if x <= acc:
+                out.append(make())
+                break
+        else:
+            out.append(mix[0][1]())
+    return out
+
+
+def load_log(path: str) -> List[Dict[str, Any]]:
+    """Đọc log requests.jsonl, bỏ qua các dòng không phải request"""
+    if not path or not os.path.exists(path):
+        return []
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and str(entry.get("path", "")).startswith("/"):
+                out.append(entry)
+    return out
+
+
+def percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    k = (len(samples) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(samples) - 1)
+    return samples[lo] + (samples[hi] - samples[lo]) * (k - lo)
+
+
+def replay(app, entries: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    local = threading.local()
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def send(entry):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        method = entry.get("method", "GET").upper()
+        route = f"{method} {entry['path']}"
+        t0 = time.perf_counter()
+        resp = client.open(entry["path"], method=method,
+                           query_string=entry.get("query"), json=entry.get("json"))
+        resp.get_data()
+        elapsed = time.perf_counter() - t0
+        with lock:
+            latencies.setdefault(route, []).append(elapsed)
+            if resp.status_code >= 500:
+                errors[route] = errors.get(route, 0) + 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, entries))
+    wall = time.perf_counter() - t0
+    return _report(entries, concurrency, wall, latencies, errors)
+
+
+def _report(entries, concurrency, wall, latencies, errors) -> Dict[str, Any]:
+    routes = {}
+    for route, samples in sorted(latencies.items()):
+        routes[route] = {
+            "count": len(samples),
+            "errors": errors.get(route, 0),
+            "rps": len(samples) / wall,
+            "mean_ms": statistics.fmean(samples) * 1000,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+        }
+    return {"requests": len(entries), "concurrency": concurrency,
+            "wall_s": wall, "rps": len(entries) / wall, "routes": routes}
+
+
+async def replay_async(app, entries: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    """Phát lại log trên app ASGI trong một event loop, tối đa concurrency request cùng lúc"""
+    import httpx
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    gate = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def send(entry):
+            method = entry.get("method", "GET").upper()
+            route = f"{method} {entry['path']}"
+            async with gate:
+                t0 = time.perf_counter()
+                resp = await client.request(method, entry["path"], params=entry.get("query"),
+                                            json=entry.get("json"))
+                elapsed = time.perf_counter() - t0
+            latencies.setdefault(route, []).append(elapsed)
+            if resp.status_code >= 500:
+                errors[route] = errors.get(route, 0) + 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(send(e) for e in entries))
+        wall = time.perf_counter() - t0
+    return _report(entries, concurrency, wall, latencies, errors)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['requests']} request, concurrency {report['concurrency']}, "
+          f"{report['wall_s']:.2f}s, {report['rps']:.1f} req/s")
+    print(f"{'route':<26}{'count':>7}{'err':>5}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+    for route, r in report["routes"].items():
+        print(f"{route:<26}{r['count']:>7}{r['errors']:>5}{r['rps']:>9.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=5000, help="số node trái cây tổng hợp")
+    parser.add_argument("--log", default="requests.jsonl", help="log request để phát lại")
+    parser.add_argument("--requests", type=int, default=1000, help="số request (lặp lại log nếu cần)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mongo-latency-ms", type=float, default=2.0)
+    parser.add_argument("--neo4j-latency-ms", type=float, default=5.0)
+    parser.add_argument("--no-cache", action="store_true", help="tắt response cache")
+    parser.add_argument("--no-index", action="store_true", help="tắt search index trong bộ nhớ")
+    parser.add_argument("--no-snapshot", action="store_true", help="tắt graph snapshot trong bộ nhớ")
+    parser.add_argument("--asgi", action="store_true", help="chạy asgi.py (client async) thay vì Flask")
+    parser.add_argument("--json", help="ghi báo cáo ra file JSON")
+    args = parser.parse_args()
+
+    app = boot_app(args.nodes, args.mongo_latency_ms / 1000, args.neo4j_latency_ms / 1000,
+                   cache=not args.no_cache, index=not args.no_index,
+                   snapshot=not args.no_snapshot, asgi=args.asgi)
+    entries = load_log(args.log) or synthetic_requests(args.requests)
+    entries = [entries[i % len(entries)] for i in range(args.requests)]
+
+    if args.asgi:
+        # asgi.py chỉ có các route đọc chính
+        entries = [e for e in entries if e["path"] in ASGI_ROUTES]
+        report = asyncio.run(replay_async(app, entries, args.concurrency))
+    else:
+        report = replay(app, entries, args.concurrency)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# clients/async_mongo_client.py
+from pymongo import AsyncMongoClient
+from .config import Config
+from .lazy import LazyClient
+from .mongo_client import _CommandTimer
+
+
+class AsyncMongoClientWrapper:
+    def __init__(self, client=None, db_name: str | None = None) -> None:
+        """
+        Bản async của MongoClientWrapper (pymongo.AsyncMongoClient) cho chế độ ASGI.
+        client: truyền sẵn client (vd. MongoDB giả lập cho benchmark) thay vì tạo mới
+        """
+        if client is None:
+            if not Config.MONGO_URI:
+                raise ValueError("Thiếu cấu hình MongoDB: MONGO_URI")
+
+            # Cùng cấu hình pool / timeout với client đồng bộ
+            client = AsyncMongoClient(
+                Config.MONGO_URI,
+                maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+                minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+                serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+                socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS or None,
+                event_listeners=[_CommandTimer()],
+            )
+        self.client = client
+
+        # Lấy tên database từ URI
+        db_name = db_name or Config.MONGO_URI.rsplit("/", 1)[-1].split("?")[0] or "test"
+        self.db = self.client[db_name]
+
+    def get_collection(self, collection_name: str):
+        """Trả về một collection MongoDB (các thao tác trên collection đều là coroutine)"""
+        return self.db[collection_name]
+
+    async def ping(self) -> bool:
+        """Ping MongoDB để kiểm tra kết nối"""
+        await self.client.admin.command("ping")
+        return True
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+# Instance dùng chung trong toàn ứng dụng ASGI, kết nối ở lần dùng đầu tiên trong mỗi worker
+async_mongo_client: AsyncMongoClientWrapper = LazyClient(AsyncMongoClientWrapper)
@@ -0,0 +1,86 @@
+# clients/async_neo4j_client.py
+import time
+from typing import Any, AsyncIterator, Dict, List
+from neo4j import AsyncGraphDatabase, Query
+from clients.config import Config
+from clients.lazy import LazyClient
+from clients.neo4j_client import _should_profile
+from services import metrics
+
+
+class AsyncNeo4jClient:
+    def __init__(self, driver=None) -> None:
+        """
+        Bản async của Neo4jClient (AsyncGraphDatabase) cho chế độ ASGI.
+        driver: truyền sẵn driver (vd. driver giả lập cho benchmark) thay vì tạo mới
+        """
+        if driver is None:
+            if not (Config.NEO4J_URI and Config.NEO4J_USER and Config.NEO4J_PASSWORD):
+                raise ValueError("Thiếu cấu hình Neo4j (NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD).")
+
+            driver = AsyncGraphDatabase.driver(
+                Config.NEO4J_URI,
+                auth=(Config.NEO4J_USER, Config.NEO4J_PASSWORD),
+                max_connection_pool_size=Config.NEO4J_MAX_POOL_SIZE,
+                connection_timeout=Config.NEO4J_CONNECTION_TIMEOUT,
+                connection_acquisition_timeout=Config.NEO4J_ACQUISITION_TIMEOUT,
+                max_connection_lifetime=Config.NEO4J_MAX_CONNECTION_LIFETIME,
+                keep_alive=Config.NEO4J_KEEP_ALIVE,
+            )
+        self.driver = driver
+
+    async def close(self) -> None:
+        await self.driver.close()
+
+    async def run_query(
+        self,
+        cypher: str,
+        params: Dict[str, Any] | None = None,
+        timeout: float | None = None,
+        raw: bool = False,
+        op: str = "query",
+    ) -> List[Dict[str, Any]]:
+        """Chạy Cypher và trả về list dict (xem Neo4jClient.run_query)"""
+        return [row async for row in self.stream_query(cypher, params, timeout=timeout, raw=raw, op=op)]
+
+    async def stream_query(
+        self,
+        cypher: str,
+        params: Dict[str, Any] | None = None,
+        timeout: float | None = None,
+        fetch_size: int | None = None,
+        raw: bool = False,
+        op: str = "query",
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Chạy Cypher và yield từng record (dict) ngay khi driver nhận được.
+        Session được đóng khi generator chạy hết hoặc bị aclose() giữa chừng.
+        """
+        params = params or {}
+        fetch_size = fetch_size or Config.NEO4J_FETCH_SIZE
+        profile = _should_profile(cypher)
+        started, rows, error = time.perf_counter(), 0, False
+        try:
+            async with self.driver.session(fetch_size=fetch_size) as session:
+                text = f"PROFILE {cypher}" if profile else cypher
+                result = await session.run(Query(text, timeout=timeout), params)
+                if raw:
+                    keys = result.keys()
+                    async for record in result:
+                        rows += 1
+                        yield dict(zip(keys, record.values()))
+                else:
+                    async for record in result:
+                        rows += 1
+                        yield record.data()
+                if profile:
+                    metrics.log_profile(cypher, (await result.consume()).profile)
+        except Exception:
+            error = True
+            raise
+        finally:
+            metrics.record_backend("neo4j", op, time.perf_counter() - started, rows, error, cypher, params)
+
+
+# Instance dùng chung trong toàn ứng dụng ASGI (driver chỉ được tạo ở lần dùng đầu tiên trong mỗi worker)
+async_neo4j_client: AsyncNeo4jClient = LazyClient(AsyncNeo4jClient)
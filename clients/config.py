@@ -4,8 +4,102 @@ import os
 class Config:
     # MongoDB Atlas
     MONGO_URI = os.getenv("MONGO_URI", "")
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0"))  # 0 = không giới hạn
+    # /mongo/products: số document tối đa mỗi trang và batch_size khi export
+    MONGO_PAGE_MAX_LIMIT = int(os.getenv("MONGO_PAGE_MAX_LIMIT", "1000"))
+    MONGO_EXPORT_BATCH_SIZE = int(os.getenv("MONGO_EXPORT_BATCH_SIZE", "2000"))
+    # Mỗi lượt export=ndjson dừng sau chừng này document / giây (dòng cuối có 'next' để gọi tiếp),
+    # để không vượt timeout của worker gunicorn (mặc định 30s)
+    MONGO_EXPORT_MAX_DOCS = int(os.getenv("MONGO_EXPORT_MAX_DOCS", "100000"))
+    MONGO_EXPORT_MAX_SECONDS = float(os.getenv("MONGO_EXPORT_MAX_SECONDS", "20"))
 
     # Neo4j Aura
     NEO4J_URI = os.getenv("NEO4J_URI", "")
     NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
     NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "")
+    NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+    NEO4J_CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "10"))
+    NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "30"))
+    # Aura đóng kết nối rảnh sau vài phút, nên giữ lifetime ngắn hơn
+    NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "300"))
+    NEO4J_KEEP_ALIVE = os.getenv("NEO4J_KEEP_ALIVE", "1") == "1"
+    NEO4J_FETCH_SIZE = int(os.getenv("NEO4J_FETCH_SIZE", "1000"))
+    # Số dòng tối đa /neo4j/query trả về (cả chế độ thường lẫn stream)
+    NEO4J_QUERY_MAX_ROWS = int(os.getenv("NEO4J_QUERY_MAX_ROWS", "10000"))
+    # limit tối đa của /neo4j/nodes (kết quả được cache nên phải có trần)
+    NEO4J_NODES_MAX_LIMIT = int(os.getenv("NEO4J_NODES_MAX_LIMIT", "1000"))
+
+    # Serializer JSON: "auto" (orjson nếu đã cài) hoặc "json" (thư viện chuẩn)
+    JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
+
+    # /search – chạy song song Neo4j + MongoDB, mỗi bên có deadline riêng (giây)
+    FANOUT_MAX_WORKERS = int(os.getenv("FANOUT_MAX_WORKERS", "16"))
+    SEARCH_NEO4J_TIMEOUT = float(os.getenv("SEARCH_NEO4J_TIMEOUT", "5"))
+    SEARCH_MONGO_TIMEOUT = float(os.getenv("SEARCH_MONGO_TIMEOUT", "5"))
+
+    # Search index trong bộ nhớ cho /search (n-gram trên rdfs__label + labels)
+    SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "1") == "1"
+    SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "60"))
+    SEARCH_INDEX_REBUILD_SECONDS = float(os.getenv("SEARCH_INDEX_REBUILD_SECONDS", "3600"))
+    SEARCH_INDEX_BATCH_SIZE = int(os.getenv("SEARCH_INDEX_BATCH_SIZE", "5000"))
+    # Độ giống n-gram (Dice) tối thiểu của kết quả fuzzy
+    SEARCH_INDEX_FUZZY_THRESHOLD = float(os.getenv("SEARCH_INDEX_FUZZY_THRESHOLD", "0.6"))
+    # Chỉ chạy fuzzy khi số kết quả khớp (exact / prefix / substring) ít hơn ngưỡng này
+    SEARCH_INDEX_FUZZY_BELOW = int(os.getenv("SEARCH_INDEX_FUZZY_BELOW", "1"))
+    # Fuzzy bỏ qua n-gram có nhiều node hơn ngưỡng này (không áp dụng cho kết quả khớp trực tiếp)
+    SEARCH_INDEX_MAX_CANDIDATES = int(os.getenv("SEARCH_INDEX_MAX_CANDIDATES", "2000"))
+    SEARCH_RESULT_LIMIT = int(os.getenv("SEARCH_RESULT_LIMIT", "50"))
+
+    # Snapshot đồ thị trong bộ nhớ (CSR từ nodes + rels) cho /graph/neighbors và quan hệ của /search
+    GRAPH_SNAPSHOT_ENABLED = os.getenv("GRAPH_SNAPSHOT_ENABLED", "1") == "1"
+    GRAPH_SNAPSHOT_REFRESH_SECONDS = float(os.getenv("GRAPH_SNAPSHOT_REFRESH_SECONDS", "60"))
+    GRAPH_SNAPSHOT_REBUILD_SECONDS = float(os.getenv("GRAPH_SNAPSHOT_REBUILD_SECONDS", "3600"))
+    GRAPH_SNAPSHOT_BATCH_SIZE = int(os.getenv("GRAPH_SNAPSHOT_BATCH_SIZE", "5000"))
+    GRAPH_NEIGHBORS_MAX_DEPTH = int(os.getenv("GRAPH_NEIGHBORS_MAX_DEPTH", "4"))
+    GRAPH_NEIGHBORS_LIMIT = int(os.getenv("GRAPH_NEIGHBORS_LIMIT", "1000"))
+
+    # Batch endpoint: /search/batch và /neo4j/query/batch
+    SEARCH_BATCH_MAX_TERMS = int(os.getenv("SEARCH_BATCH_MAX_TERMS", "20"))
+    NEO4J_BATCH_MAX_QUERIES = int(os.getenv("NEO4J_BATCH_MAX_QUERIES", "20"))
+    # Deadline (giây) của transaction đọc /neo4j/query/batch
+    NEO4J_BATCH_TIMEOUT = float(os.getenv("NEO4J_BATCH_TIMEOUT", "10"))
+
+    # Cache response (LRU + TTL theo route); CACHE_REDIS_URL để dùng chung giữa các worker
+    CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    # Tổng kích thước (byte JSON, xấp xỉ) tối đa của cache trong bộ nhớ mỗi worker; 0 = không giới hạn
+    CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "")
+    CACHE_TTL_SEARCH = float(os.getenv("CACHE_TTL_SEARCH", "60"))
+    CACHE_TTL_NEO4J_NODES = float(os.getenv("CACHE_TTL_NEO4J_NODES", "300"))
+    CACHE_TTL_MONGO_PRODUCTS = float(os.getenv("CACHE_TTL_MONGO_PRODUCTS", "300"))
+
+    # Token cho các route /admin/* (để trống = tắt các route này)
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+    # Metrics Prometheus (/metrics) và slow-query log
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+    # Thư mục chung để gộp metrics giữa các worker gunicorn (để trống = chỉ worker hiện tại)
+    METRICS_DIR = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+    # Tỉ lệ truy vấn Neo4j được chạy kèm PROFILE để log kế hoạch thực thi (0 = tắt)
+    NEO4J_PROFILE_SAMPLE_RATE = float(os.getenv("NEO4J_PROFILE_SAMPLE_RATE", "0"))
+
+    # Health check chạy nền; /health trả kết quả đã cache
+    HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "15"))
+
+    # Đồng bộ Neo4j -> MongoDB (python -m services.sync, POST /admin/sync)
+    SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "2000"))
+    # Thuộc tính thời gian (ms, vd. n.updated_at = timestamp()) để chỉ lấy node / rel đã đổi
+    SYNC_UPDATED_PROPERTY = os.getenv("SYNC_UPDATED_PROPERTY", "")
+    # Nghỉ giữa các batch để không chiếm hết tài nguyên của API
+    SYNC_PAUSE_MS = float(os.getenv("SYNC_PAUSE_MS", "0"))
+    SYNC_STATE_COLLECTION = os.getenv("SYNC_STATE_COLLECTION", "sync_state")
+    # Lease chống chạy hai lượt sync cùng lúc; được gia hạn sau mỗi batch
+    SYNC_LEASE_SECONDS = float(os.getenv("SYNC_LEASE_SECONDS", "600"))
@@ -0,0 +1,50 @@
+# clients/lazy.py
+import os
+import threading
+from typing import Any, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyClient(Generic[T]):
+    """
+    Tạo client ở lần dùng đầu tiên trong mỗi process.
+    Sau khi gunicorn fork, worker con tự tạo kết nối riêng thay vì dùng chung
+    connection pool của process cha (an toàn với --preload).
+    """
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        self._factory = factory
+        self._instance: T | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        # không close() client của process cha: socket vẫn đang được cha dùng
+        self._instance = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        """Trả về client của process hiện tại, tạo mới nếu chưa có"""
+        if self._instance is None or self._pid != os.getpid():
+            with self._lock:
+                if self._instance is None or self._pid != os.getpid():
+                    self._instance = self._factory()
+                    self._pid = os.getpid()
+        return self._instance
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None and self._pid == os.getpid()
+
+    def override(self, instance: T) -> None:
+        """Gắn sẵn một client (dùng cho benchmark / backend giả lập)"""
+        with self._lock:
+            self._instance = instance
+            self._pid = os.getpid()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
@@ -1,21 +1,81 @@
 # clients/mongo_client.py
-from pymongo import MongoClient
+import threading
+import bson
+from pymongo import MongoClient, monitoring
 from .config import Config
+from .lazy import LazyClient
+from services import metrics
 
 
-class MongoClientWrapper:
+class _CommandTimer(monitoring.CommandListener):
+    """Đo thời gian, số document và số byte reply của từng lệnh MongoDB (find, getMore, aggregate, ...)"""
+
+    IGNORED = {"ping", "hello", "ismaster", "isMaster", "endSessions", "saslStart", "saslContinue"}
+
     def __init__(self) -> None:
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _key(self, event):
+        return event.connection_id, event.request_id
+
+    def started(self, event) -> None:
+        if event.command_name in self.IGNORED:
+            return
+        cmd = event.command
+        collection = cmd.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = cmd.get("collection", "")
+        query = cmd.get("filter", cmd.get("pipeline", cmd.get("query")))
+        with self._lock:
+            self._pending[self._key(event)] = (f"{event.command_name}:{collection}", query)
+
+    def _finish(self, event, rows, error, reply_bytes=None) -> None:
+        with self._lock:
+            pending = self._pending.pop(self._key(event), None)
+        if pending is None:
+            return
+        op, query = pending
+        metrics.record_backend("mongo", op, event.duration_micros / 1e6, rows, error, query,
+                               reply_bytes=reply_bytes)
+
+    def succeeded(self, event) -> None:
+        if event.command_name in self.IGNORED:
+            return
+        cursor = event.reply.get("cursor") or {}
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        # reply đã được giải mã cho listener: encode lại để biết kích thước payload trên dây
+        self._finish(event, len(batch) if batch is not None else None, False, len(bson.encode(event.reply)))
+
+    def failed(self, event) -> None:
+        self._finish(event, None, True)
+
+
+class MongoClientWrapper:
+    def __init__(self, client=None, db_name: str | None = None) -> None:
         """
         Kết nối MongoDB Atlas hoặc MongoDB local dựa trên MONGO_URI trong file .env
+        client: truyền sẵn client (vd. MongoDB giả lập cho benchmark) thay vì tạo mới
         """
-        if not Config.MONGO_URI:
-            raise ValueError("Thiếu cấu hình MongoDB: MONGO_URI")
+        if client is None:
+            if not Config.MONGO_URI:
+                raise ValueError("Thiếu cấu hình MongoDB: MONGO_URI")
 
-        # Tạo client MongoDB
-        self.client = MongoClient(Config.MONGO_URI)
+            # Tạo client MongoDB, cấu hình pool / timeout lấy từ Config
+            client = MongoClient(
+                Config.MONGO_URI,
+                maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+                minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+                serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+                socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS or None,
+                event_listeners=[_CommandTimer()],
+            )
+        self.client = client
 
         # Lấy tên database từ URI
-        db_name = Config.MONGO_URI.rsplit("/", 1)[-1].split("?")[0] or "test"
+        db_name = db_name or Config.MONGO_URI.rsplit("/", 1)[-1].split("?")[0] or "test"
         self.db = self.client[db_name]
 
     def get_collection(self, collection_name: str):
@@ -28,5 +88,5 @@ class MongoClientWrapper:
         return True
 
 
-# Instance dùng chung trong toàn ứng dụng
-mongo_client = MongoClientWrapper()
+# Instance dùng chung trong toàn ứng dụng, kết nối ở lần dùng đầu tiên trong mỗi worker
+mongo_client: MongoClientWrapper = LazyClient(MongoClientWrapper)
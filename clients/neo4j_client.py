@@ -1,28 +1,144 @@
 # clients/neo4j_client.py
-from typing import Any, Dict, List
-from neo4j import GraphDatabase
+import random
+import time
+from typing import Any, Dict, Iterator, List
+from neo4j import GraphDatabase, Query, unit_of_work
 from clients.config import Config
+from clients.lazy import LazyClient
+from services import metrics
+
+# Các câu Cypher không thể thêm tiền tố PROFILE
+_NO_PROFILE_PREFIXES = ("EXPLAIN", "PROFILE", "CYPHER", "USING", ":")
+
+
+def _should_profile(cypher: str) -> bool:
+    rate = Config.NEO4J_PROFILE_SAMPLE_RATE
+    if rate <= 0 or random.random() >= rate:
+        return False
+    return not cypher.lstrip().upper().startswith(_NO_PROFILE_PREFIXES)
 
 
 class Neo4jClient:
-    def __init__(self) -> None:
-        if not (Config.NEO4J_URI and Config.NEO4J_USER and Config.NEO4J_PASSWORD):
-            raise ValueError("Thiếu cấu hình Neo4j (NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD).")
+    def __init__(self, driver=None) -> None:
+        """driver: truyền sẵn driver (vd. driver giả lập cho benchmark) thay vì tạo mới"""
+        if driver is None:
+            if not (Config.NEO4J_URI and Config.NEO4J_USER and Config.NEO4J_PASSWORD):
+                raise ValueError("Thiếu cấu hình Neo4j (NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD).")
 
-        self.driver = GraphDatabase.driver(
-            Config.NEO4J_URI,
-            auth=(Config.NEO4J_USER, Config.NEO4J_PASSWORD),
-        )
+            driver = GraphDatabase.driver(
+                Config.NEO4J_URI,
+                auth=(Config.NEO4J_USER, Config.NEO4J_PASSWORD),
+                max_connection_pool_size=Config.NEO4J_MAX_POOL_SIZE,
+                connection_timeout=Config.NEO4J_CONNECTION_TIMEOUT,
+                connection_acquisition_timeout=Config.NEO4J_ACQUISITION_TIMEOUT,
+                max_connection_lifetime=Config.NEO4J_MAX_CONNECTION_LIFETIME,
+                keep_alive=Config.NEO4J_KEEP_ALIVE,
+            )
+        self.driver = driver
 
     def close(self) -> None:
         self.driver.close()
 
-    def run_query(self, cypher: str, params: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
+    def run_query(
+        self,
+        cypher: str,
+        params: Dict[str, Any] | None = None,
+        timeout: float | None = None,
+        raw: bool = False,
+        op: str = "query",
+    ) -> List[Dict[str, Any]]:
+        """
+        Chạy Cypher và trả về list dict.
+        timeout (giây): giới hạn thời gian transaction phía server, None = không giới hạn.
+        op: tên nhóm truy vấn dùng làm nhãn metrics.
+        """
+        return list(self.stream_query(cypher, params, timeout=timeout, raw=raw, op=op))
+
+    def stream_query(
+        self,
+        cypher: str,
+        params: Dict[str, Any] | None = None,
+        timeout: float | None = None,
+        fetch_size: int | None = None,
+        raw: bool = False,
+        op: str = "query",
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Chạy Cypher và yield từng record (dict) ngay khi driver nhận được.
+        fetch_size: số record driver kéo về mỗi lần, mặc định Config.NEO4J_FETCH_SIZE.
+        raw=True: giữ nguyên Node / Relationship / Path thay vì record.data().
+        Session được đóng khi generator chạy hết hoặc bị close() giữa chừng.
+        """
         params = params or {}
-        with self.driver.session() as session:
-            result = session.run(cypher, params)
-            return [record.data() for record in result]
+        fetch_size = fetch_size or Config.NEO4J_FETCH_SIZE
+        profile = _should_profile(cypher)
+        started, rows, error = time.perf_counter(), 0, False
+        try:
+            with self.driver.session(fetch_size=fetch_size) as session:
+                text = f"PROFILE {cypher}" if profile else cypher
+                result = session.run(Query(text, timeout=timeout), params)
+                if raw:
+                    keys = result.keys()
+                    for record in result:
+                        rows += 1
+                        yield dict(zip(keys, record.values()))
+                else:
+                    for record in result:
+                        rows += 1
+                        yield record.data()
+                if profile:
+                    metrics.log_profile(cypher, result.consume().profile)
+        except Exception:
+            error = True
+            raise
+        finally:
+            metrics.record_backend("neo4j", op, time.perf_counter() - started, rows, error, cypher, params)
+
+    def run_read_batch(
+        self,
+        statements: List[Dict[str, Any]],
+        timeout: float | None = None,
+        max_rows: int | None = None,
+        raw: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Chạy nhiều câu Cypher chỉ-đọc trong một read transaction (một round trip session).
+        statements: [{"query": ..., "params": {...}}, ...]
+        Trả về [{"count", "truncated", "data"}, ...] theo đúng thứ tự.
+        """
+        if max_rows is None:
+            max_rows = Config.NEO4J_QUERY_MAX_ROWS
+
+        @unit_of_work(timeout=timeout)
+        def work(tx):
+            out = []
+            for st in statements:
+                result = tx.run(st["query"], st.get("params") or {})
+                keys = result.keys()
+                rows, truncated = [], False
+                for record in result:
+                    if len(rows) >= max_rows:
+                        truncated = True
+                        break
+                    rows.append(dict(zip(keys, record.values())) if raw else record.data())
+                result.consume()
+                out.append({"count": len(rows), "truncated": truncated, "data": rows})
+            return out
+
+        started, error, out = time.perf_counter(), False, []
+        try:
+            with self.driver.session(fetch_size=Config.NEO4J_FETCH_SIZE) as session:
+                out = session.execute_read(work)
+                return out
+        except Exception:
+            error = True
+            raise
+        finally:
+            rows = sum(r["count"] for r in out)
+            metrics.record_backend("neo4j", "batch", time.perf_counter() - started, rows, error,
+                                   [st["query"] for st in statements])
 
 
 # ⭐ QUAN TRỌNG: phải có dòng này để app.py import được
-neo4j_client = Neo4jClient()
+# (driver chỉ được tạo ở lần dùng đầu tiên trong mỗi worker)
+neo4j_client: Neo4jClient = LazyClient(Neo4jClient)
@@ -0,0 +1,265 @@
+# services/cache.py
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from clients.config import Config
+from services import metrics
+from services.serializer import dumps
+
+try:  # backend dùng chung giữa các worker gunicorn (tùy chọn)
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """
+    LRU + TTL trong bộ nhớ của một process, giới hạn số entry và tổng kích thước.
+    Kích thước mỗi entry xấp xỉ bằng số byte JSON của nó; entry lớn hơn max_bytes không được cache.
+    """
+
+    shared = False
+
+    def __init__(self, max_entries: int, max_bytes: int = 0) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._data: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pop(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self.bytes -= size
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value, _ = item
+            if expires_at < time.monotonic():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        size = len(dumps(value)) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (time.monotonic() + ttl, value, size)
+            self.bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(prefix)]
+            for k in keys:
+                self._pop(k)
+            return len(keys)
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class RedisBackend:
+    """
+    Backend Redis để mọi worker trong Procfile thấy cùng một cache.
+    Giới hạn bộ nhớ / LRU do Redis đảm nhiệm (maxmemory-policy allkeys-lru).
+    """
+
+    shared = True
+    evictions = 0
+
+    def __init__(self, url: str, namespace: str = "thesis:cache:") -> None:
+        self.namespace = namespace
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Any:
+        raw = self._redis.get(self.namespace + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        raw = dumps(value)
+        self._redis.set(self.namespace + key, raw, px=max(1, int(ttl * 1000)))
+
+    def delete_prefix(self, prefix: str) -> int:
+        keys = list(self._redis.scan_iter(match=self.namespace + prefix + "*", count=500))
+        if keys:
+            self._redis.delete(*keys)
+        return len(keys)
+
+    def size(self) -> int:
+        return sum(1 for _ in self._redis.scan_iter(match=self.namespace + "*", count=500))
+
+
+class ResponseCache:
+    """
+    Cache response theo route với TTL riêng cho từng route.
+    Các request giống nhau đang chờ cùng một key chỉ gọi backend một lần (coalescing).
+    """
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[Tuple[int, str], "asyncio.Future[Any]"] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, route: str, field: str) -> None:
+        with self._lock:
+            route_stats = self._stats.setdefault(route, {"hits": 0, "misses": 0, "coalesced": 0})
+            route_stats[field] += 1
+        metrics.registry.inc("cache_requests_total", {"route": route, "result": field})
+
+    def get_or_compute(
+        self,
+        route: str,
+        params: str,
+        ttl: float,
+        compute: Callable[[], Any],
+        cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """Trả về giá trị trong cache, nếu không có thì gọi compute() rồi lưu lại"""
+        key = f"{route}:{params}"
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            logger.exception("Cache: lỗi khi đọc %s", key)
+            value = None
+        if value is not None:
+            self._count(route, "hits")
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self._count(route, "coalesced")
+            return future.result()
+
+        self._count(route, "misses")
+        try:
+            value = compute()
+            if cacheable(value):
+                try:
+                    self.backend.set(key, value, ttl)
+                except Exception:
+                    logger.exception("Cache: lỗi khi ghi %s", key)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def _backend_call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        # Redis là I/O mạng: chạy trong thread để không chặn event loop
+        if self.backend.shared:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def aget_or_compute(
+        self,
+        route: str,
+        params: str,
+        ttl: float,
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """Bản async của get_or_compute: compute là coroutine, gộp request trùng trong cùng event loop"""
+        key = f"{route}:{params}"
+        try:
+            value = await self._backend_call(self.backend.get, key)
+        except Exception:
+            logger.exception("Cache: lỗi khi đọc %s", key)
+            value = None
+        if value is not None:
+            self._count(route, "hits")
+            return value
+
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        future = self._ainflight.get(inflight_key)
+        if future is not None:
+            self._count(route, "coalesced")
+            return await asyncio.shield(future)
+        future = self._ainflight[inflight_key] = loop.create_future()
+
+        self._count(route, "misses")
+        try:
+            value = await compute()
+            if cacheable(value):
+                try:
+                    await self._backend_call(self.backend.set, key, value, ttl)
+                except Exception:
+                    logger.exception("Cache: lỗi khi ghi %s", key)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # tránh cảnh báo "exception was never retrieved" khi không có request nào chờ
+            future.exception()
+            raise
+        finally:
+            self._ainflight.pop(inflight_key, None)
+
+    def invalidate(self, route: str | None = None) -> int:
+        """Xóa các entry của một route (hoặc toàn bộ khi route=None)"""
+        return self.backend.delete_prefix(f"{route}:" if route else "")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {r: dict(s) for r, s in self._stats.items()}
+        try:
+            size = self.backend.size()
+        except Exception:
+            size = None
+        return {
+            "backend": type(self.backend).__name__,
+            "shared": self.backend.shared,
+            "size": size,
+            "max_entries": getattr(self.backend, "max_entries", None),
+            "bytes": getattr(self.backend, "bytes", None),
+            "max_bytes": getattr(self.backend, "max_bytes", None),
+            "evictions": self.backend.evictions,
+            "routes": routes,
+        }
+
+
+def _make_backend():
+    if Config.CACHE_REDIS_URL:
+        if redis is not None:
+            return RedisBackend(Config.CACHE_REDIS_URL)
+        logger.warning("CACHE_REDIS_URL đã đặt nhưng chưa cài 'redis', dùng cache trong bộ nhớ")
+    return MemoryBackend(Config.CACHE_MAX_ENTRIES, Config.CACHE_MAX_BYTES)
+
+
+def normalize_query(q: str) -> str:
+    """Chuẩn hóa chuỗi truy vấn làm khóa cache"""
+    return " ".join(q.lower().split())
+
+
+# Instance dùng chung trong toàn ứng dụng
+response_cache = ResponseCache(_make_backend())
@@ -0,0 +1,44 @@
+# services/fanout.py
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Tuple
+
+from clients.config import Config
+
+
+# Thread pool dùng chung cho các lời gọi backend chạy song song.
+# Thread chỉ được tạo khi submit lần đầu nên an toàn khi gunicorn fork.
+_executor = ThreadPoolExecutor(
+    max_workers=Config.FANOUT_MAX_WORKERS,
+    thread_name_prefix="fanout",
+)
+
+
+def submit(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Chạy fn trong thread pool, trả về Future"""
+    return _executor.submit(fn, *args, **kwargs)
+
+
+def deadline_after(seconds: float) -> float:
+    """Mốc thời gian tuyệt đối (time.monotonic) sau `seconds` giây"""
+    return time.monotonic() + seconds
+
+
+def remaining(deadline: float) -> float:
+    """Số giây còn lại tới deadline (không âm)"""
+    return max(0.0, deadline - time.monotonic())
+
+
+def collect(future: Future, deadline: float) -> Tuple[Any, str | None, bool]:
+    """
+    Chờ kết quả của future tới deadline.
+    Trả về (result, error, timed_out). Khi quá hạn, future vẫn chạy tiếp
+    trong nền nhưng kết quả bị bỏ qua.
+    """
+    try:
+        return future.result(timeout=remaining(deadline)), None, False
+    except FutureTimeout:
+        future.cancel()
+        return None, "Quá thời gian chờ", True
+    except Exception as e:
+        return None, str(e), False
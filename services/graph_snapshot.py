@@ -0,0 +1,373 @@
+# services/graph_snapshot.py
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+from clients.config import Config
+from services.sync import advance_marks, changed_filter, graph_sync, new_marks
+
+logger = logging.getLogger(__name__)
+
+OUT = "out"
+IN = "in"
+BOTH = "both"
+
+
+class NodeRecord:
+    """Thông tin tối thiểu của một node trong snapshot"""
+
+    __slots__ = ("neo4j_id", "label", "labels")
+
+    def __init__(self, neo4j_id: Any, label: str | None = None, labels: Tuple[str, ...] = ()) -> None:
+        self.neo4j_id = neo4j_id
+        self.label = label
+        self.labels = labels
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.neo4j_id, "label": self.label, "labels": list(self.labels)}
+
+
+class _Graph:
+    """
+    Đồ thị dạng CSR: node được đánh số 0..n-1, cạnh 0..m-1.
+    out_edges[out_offsets[i]:out_offsets[i + 1]] là các cạnh đi ra từ node i (tương tự cho in_*).
+    Cạnh nạp thêm sau lần build nằm trong pending_out / pending_in cho tới lần build kế tiếp.
+    """
+
+    def __init__(self) -> None:
+        self.nodes: List[NodeRecord] = []
+        self.index: Dict[Any, int] = {}
+        self.types: List[str] = []
+        self.type_ids: Dict[str, int] = {}
+        self.label_sets: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self.edge_src = array("i")
+        self.edge_dst = array("i")
+        self.edge_type = array("I")
+        self.edge_ids: List[Any] = []
+        self.edge_index: Dict[Any, int] = {}
+        self.out_offsets = array("q", [0])
+        self.out_edges = array("i")
+        self.in_offsets = array("q", [0])
+        self.in_edges = array("i")
+        self.pending_out: Dict[int, List[int]] = {}
+        self.pending_in: Dict[int, List[int]] = {}
+
+    # ---------- NẠP DỮ LIỆU ----------
+    def add_node(self, neo4j_id: Any, label: str | None, labels: Iterable[str]) -> int:
+        labels = tuple(labels)
+        labels = self.label_sets.setdefault(labels, labels)
+        i = self.index.get(neo4j_id)
+        if i is None:
+            i = self.index[neo4j_id] = len(self.nodes)
+            self.nodes.append(NodeRecord(neo4j_id, label, labels))
+        else:
+            rec = self.nodes[i]
+            rec.label, rec.labels = label, labels
+        return i
+
+    def _node(self, neo4j_id: Any) -> int:
+        # rel có thể được nạp trước node của nó: tạo node tạm, điền thông tin khi node tới
+        i = self.index.get(neo4j_id)
+        return self.add_node(neo4j_id, None, ()) if i is None else i
+
+    def add_edge(self, rel_id: Any, rel_type: str, start_id: Any, end_id: Any) -> int | None:
+        if rel_id in self.edge_index:
+            return None
+        t = self.type_ids.get(rel_type)
+        if t is None:
+            t = self.type_ids[rel_type] = len(self.types)
+            self.types.append(rel_type)
+        e = len(self.edge_ids)
+        self.edge_src.append(self._node(start_id))
+        self.edge_dst.append(self._node(end_id))
+        self.edge_type.append(t)
+        self.edge_ids.append(rel_id)
+        self.edge_index[rel_id] = e
+        return e
+
+    def compact(self) -> None:
+        """Dựng lại CSR từ toàn bộ cạnh (counting sort theo node nguồn / đích)"""
+        self.out_offsets, self.out_edges = _csr(len(self.nodes), self.edge_src)
+        self.in_offsets, self.in_edges = _csr(len(self.nodes), self.edge_dst)
+        self.pending_out, self.pending_in = {}, {}
+
+    def append_pending(self, e: int) -> None:
+        self.pending_out.setdefault(self.edge_src[e], []).append(e)
+        self.pending_in.setdefault(self.edge_dst[e], []).append(e)
+
+    # ---------- DUYỆT ----------
+    def edges(self, i: int, direction: str) -> Iterable[Tuple[int, int, str]]:
+        """(cạnh, node kề, chiều) của node i"""
+        if direction in (OUT, BOTH):
+            if i + 1 < len(self.out_offsets):
+                for e in self.out_edges[self.out_offsets[i]:self.out_offsets[i + 1]]:
+                    yield e, self.edge_dst[e], OUT
+            for e in self.pending_out.get(i, ()):
+                yield e, self.edge_dst[e], OUT
+        if direction in (IN, BOTH):
+            if i + 1 < len(self.in_offsets):
+                for e in self.in_edges[self.in_offsets[i]:self.in_offsets[i + 1]]:
+                    yield e, self.edge_src[e], IN
+            for e in self.pending_in.get(i, ()):
+                yield e, self.edge_src[e], IN
+
+
+def _csr(n: int, keys: array) -> Tuple[array, array]:
+    offsets = array("q", [0]) * (n + 1)
+    for k in keys:
+        offsets[k + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    cursor = array("q", offsets)
+    edges = array("i", [0]) * len(keys)
+    for e, k in enumerate(keys):
+        edges[cursor[k]] = e
+        cursor[k] += 1
+    return offsets, edges
+
+
+def _first(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return value[0] if value else None
+    return value
+
+
+class GraphSnapshot:
+    """
+    Bản sao đồ thị (nodes + rels trong MongoDB) trong bộ nhớ để trả lời truy vấn
+    láng giềng k bước mà không cần Cypher độ dài biến thiên trên Neo4j.
+    Chỉ thread nền gọi build / refresh; nơi khác (vd. sau khi sync) gọi request_rebuild().
+    """
+
+    NODE_PROJECTION = {"_id": 1, "neo4j_id": 1, "labels": 1, "props.rdfs__label": 1, "synced_at": 1}
+    REL_PROJECTION = {"_id": 1, "neo4j_id": 1, "type": 1, "start_neo4j_id": 1, "end_neo4j_id": 1,
+                      "synced_at": 1}
+
+    def __init__(self, get_collection: Callable[[str], Any],
+                 get_generation: Callable[[], Any] = lambda: None) -> None:
+        self._get_collection = get_collection
+        # đổi giá trị (lượt sync mới xong ở worker bất kỳ) thì nạp lại toàn bộ
+        self._get_generation = get_generation
+        self._generation = None
+        self._rebuild = threading.Event()
+        self._lock = threading.RLock()
+        self._graph = _Graph()
+        self._marks = {"nodes": new_marks(), "rels": new_marks()}
+        self._last_full_build = 0.0
+        self._pid: int | None = None
+        self.ready = False
+
+    # ---------- XÂY DỰNG / CẬP NHẬT ----------
+    def _cursor(self, name: str, marks: Dict[str, Any], projection: Dict[str, int]):
+        return (self._get_collection(name).find(changed_filter(marks), projection)
+                .sort("_id", 1).batch_size(Config.GRAPH_SNAPSHOT_BATCH_SIZE))
+
+    def _load_nodes(self, graph: _Graph, docs: Iterable[Dict[str, Any]], marks: Dict[str, Any]) -> int:
+        count = 0
+        for doc in docs:
+            advance_marks(marks, doc)
+            if "neo4j_id" not in doc:
+                continue
+            label = _first((doc.get("props") or {}).get("rdfs__label"))
+            graph.add_node(doc["neo4j_id"], label, doc.get("labels") or ())
+            count += 1
+        return count
+
+    def _load_rels(self, graph: _Graph, docs: Iterable[Dict[str, Any]], marks: Dict[str, Any]) -> List[int]:
+        added = []
+        for doc in docs:
+            advance_marks(marks, doc)
+            if "start_neo4j_id" not in doc or "end_neo4j_id" not in doc:
+                continue
+            # rel thiếu neo4j_id được lưu bằng _id (ObjectId); queries.mongo_rels_filter tra lại theo _id
+            e = graph.add_edge(doc.get("neo4j_id", doc["_id"]), doc.get("type") or "",
+                               doc["start_neo4j_id"], doc["end_neo4j_id"])
+            if e is not None:
+                added.append(e)
+        return added
+
+    def build(self) -> int:
+        """Nạp lại toàn bộ nodes + rels từ MongoDB, dựng CSR rồi hoán đổi"""
+        graph = _Graph()
+        marks = {"nodes": new_marks(), "rels": new_marks()}
+        self._load_nodes(graph, self._cursor("nodes", marks["nodes"], self.NODE_PROJECTION), marks["nodes"])
+        self._load_rels(graph, self._cursor("rels", marks["rels"], self.REL_PROJECTION), marks["rels"])
+        graph.compact()
+        with self._lock:
+            self._graph = graph
+            self._marks = marks
+            self._last_full_build = time.monotonic()
+            self.ready = True
+        logger.info("Graph snapshot: đã nạp %d node, %d cạnh, %d loại quan hệ",
+                    len(graph.nodes), len(graph.edge_ids), len(graph.types))
+        return len(graph.edge_ids)
+
+    def refresh(self) -> int:
+        """
+        Nạp node / rel mới hoặc được sync ghi lại (services.sync.changed_filter) kể từ lần nạp trước.
+        Node đổi nhãn được cập nhật; rel đã có giữ nguyên, rel / node bị xóa chờ lần nạp lại toàn bộ.
+        """
+        if not self.ready:
+            return self.build()
+        with self._lock:
+            marks = {name: dict(m) for name, m in self._marks.items()}
+        nodes = list(self._cursor("nodes", marks["nodes"], self.NODE_PROJECTION))
+        rels = list(self._cursor("rels", marks["rels"], self.REL_PROJECTION))
+        with self._lock:
+            graph = self._graph
+            self._load_nodes(graph, nodes, marks["nodes"])
+            added = self._load_rels(graph, rels, marks["rels"])
+            for e in added:
+                graph.append_pending(e)
+            self._marks = marks
+        return len(added)
+
+    def request_rebuild(self) -> None:
+        """Báo thread nền nạp lại toàn bộ ngay (không chờ hết chu kỳ refresh)"""
+        self._rebuild.set()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                generation = self._get_generation()
+                stale = time.monotonic() - self._last_full_build > Config.GRAPH_SNAPSHOT_REBUILD_SECONDS
+                if not self.ready or stale or self._rebuild.is_set() or generation != self._generation:
+                    self._rebuild.clear()
+                    self.build()
+                    self._generation = generation
+                else:
+                    self.refresh()
+            except Exception:
+                logger.exception("Graph snapshot: lỗi khi nạp dữ liệu")
+            self._rebuild.wait(Config.GRAPH_SNAPSHOT_REFRESH_SECONDS)
+
+    def ensure_started(self) -> None:
+        """Khởi động thread nạp/cập nhật snapshot (một lần cho mỗi process worker)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="graph-snapshot", daemon=True).start()
+
+    # ---------- TRA CỨU ----------
+    @staticmethod
+    def _resolve(graph: _Graph, neo4j_id: Any) -> int | None:
+        """neo4j_id từ query string / Neo4j có thể khác kiểu (chuỗi / số) với mongo"""
+        i = graph.index.get(neo4j_id)
+        if i is None and isinstance(neo4j_id, str) and neo4j_id.lstrip("-").isdigit():
+            i = graph.index.get(int(neo4j_id))
+        if i is None and isinstance(neo4j_id, int):
+            i = graph.index.get(str(neo4j_id))
+        return i
+
+    def node(self, neo4j_id: Any) -> Dict[str, Any] | None:
+        with self._lock:
+            i = self._resolve(self._graph, neo4j_id)
+            return None if i is None else self._graph.nodes[i].to_dict()
+
+    def relations(self, neo4j_id: Any) -> List[Dict[str, Any]]:
+        """Quan hệ đi ra của node, cùng dạng với OPTIONAL MATCH (n)-[r]->(m) trong /search"""
+        with self._lock:
+            graph = self._graph
+            i = self._resolve(graph, neo4j_id)
+            if i is None:
+                return []
+            out, seen = [], set()
+            for e, j, _ in graph.edges(i, OUT):
+                target = graph.nodes[j]
+                key = (graph.edge_type[e], j)
+                if key in seen:
+                    continue
+                seen.add(key)
+                out.append({
+                    "type": graph.types[graph.edge_type[e]],
+                    "target_label": target.label or "",
+                    "target_labels": list(target.labels),
+                })
+            return out
+
+    def edge_ids(self, neo4j_ids: Iterable[Any]) -> List[Any]:
+        """neo4j_id (hoặc _id nếu rel thiếu neo4j_id) của mọi rel nối với các node đã cho (cả hai chiều)"""
+        with self._lock:
+            graph = self._graph
+            found: Dict[Any, None] = {}
+            for nid in neo4j_ids:
+                i = self._resolve(graph, nid)
+                if i is not None:
+                    for e, _, _ in graph.edges(i, BOTH):
+                        found[graph.edge_ids[e]] = None
+            return list(found)
+
+    def neighbors(self, neo4j_id: Any, depth: int = 1, types: Iterable[str] | None = None,
+                  direction: str = BOTH, limit: int | None = None) -> Dict[str, Any] | None:
+        """
+        Duyệt BFS tối đa depth bước từ node neo4j_id, chỉ theo các loại quan hệ trong types.
+        Mỗi node kề xuất hiện một lần ở khoảng cách ngắn nhất, kèm cạnh đã dẫn tới nó.
+        Trả về None nếu node không có trong snapshot.
+        """
+        limit = limit or Config.GRAPH_NEIGHBORS_LIMIT
+        with self._lock:
+            graph = self._graph
+            start = self._resolve(graph, neo4j_id)
+            if start is None:
+                return None
+            allowed: Set[int] | None = None
+            if types:
+                allowed = {graph.type_ids[t] for t in types if t in graph.type_ids}
+
+            visited = {start}
+            queue = deque([(start, 0)])
+            result, truncated = [], False
+            while queue and not truncated:
+                i, d = queue.popleft()
+                if d >= depth:
+                    continue
+                for e, j, way in graph.edges(i, direction):
+                    if j in visited or (allowed is not None and graph.edge_type[e] not in allowed):
+                        continue
+                    if len(result) >= limit:
+                        truncated = True
+                        break
+                    visited.add(j)
+                    queue.append((j, d + 1))
+                    result.append({
+                        **graph.nodes[j].to_dict(),
+                        "depth": d + 1,
+                        "via": {
+                            "id": graph.edge_ids[e],
+                            "type": graph.types[graph.edge_type[e]],
+                            "direction": way,
+                            "from": graph.nodes[i].neo4j_id,
+                        },
+                    })
+            return {
+                "node": graph.nodes[start].to_dict(),
+                "neighbors": result,
+                "truncated": truncated,
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            graph = self._graph
+            return {
+                "ready": self.ready,
+                "nodes": len(graph.nodes),
+                "edges": len(graph.edge_ids),
+                "types": len(graph.types),
+                "pending_edges": sum(len(v) for v in graph.pending_out.values()),
+            }
+
+
+# Instance dùng chung trong toàn ứng dụng (nạp dữ liệu khi gọi ensure_started)
+def _collection(name):
+    from clients.mongo_client import mongo_client
+    return mongo_client.get_collection(name)
+
+
+graph_snapshot = GraphSnapshot(_collection, graph_sync.generation)
@@ -0,0 +1,86 @@
+# services/health.py
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from clients.config import Config
+
+logger = logging.getLogger(__name__)
+
+Check = Callable[[], Dict[str, Any]]
+
+
+class HealthProber:
+    """
+    Thread nền kiểm tra từng backend theo chu kỳ, lưu trạng thái + độ trễ.
+    /health chỉ đọc trạng thái đã lưu nên probe của load balancer không gọi Atlas / Aura.
+    """
+
+    def __init__(self, checks: Dict[str, Check]) -> None:
+        self._checks = checks
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+
+    def probe(self, name: str) -> Dict[str, Any]:
+        """Chạy check của một backend, trả về và lưu trạng thái mới"""
+        started = time.perf_counter()
+        try:
+            status = {"ok": True, **self._checks[name]()}
+        except Exception as e:
+            status = {"ok": False, "error": str(e)}
+        status["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        status["checked_at"] = time.time()
+        with self._lock:
+            self._status[name] = status
+        return status
+
+    def probe_all(self) -> None:
+        for name in self._checks:
+            self.probe(name)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.probe_all()
+            except Exception:
+                logger.exception("Health: lỗi khi kiểm tra backend")
+            time.sleep(Config.HEALTH_PROBE_INTERVAL)
+
+    def ensure_started(self) -> None:
+        """Khởi động thread probe (một lần cho mỗi process worker)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="health-prober", daemon=True).start()
+
+    def status(self, name: str) -> Dict[str, Any]:
+        """Trạng thái đã cache; chạy check ngay nếu chưa có hoặc đã quá cũ"""
+        with self._lock:
+            status = self._status.get(name)
+        stale = status is None or time.time() - status["checked_at"] > 3 * Config.HEALTH_PROBE_INTERVAL
+        if stale:
+            status = self.probe(name)
+        return dict(status)
+
+
+# -------------------------------------------------
+# CHECK CHO TỪNG BACKEND
+# -------------------------------------------------
+def _check_mongo() -> Dict[str, Any]:
+    from clients.mongo_client import mongo_client
+    return {"collections": mongo_client.db.list_collection_names()}
+
+
+def _check_neo4j() -> Dict[str, Any]:
+    from clients.neo4j_client import neo4j_client
+    return {"result": neo4j_client.run_query("RETURN 1 AS ok", op="health")}
+
+
+# Instance dùng chung trong toàn ứng dụng
+health_prober = HealthProber({"mongo": _check_mongo, "neo4j": _check_neo4j})
@@ -0,0 +1,266 @@
+# services/metrics.py
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Tuple
+
+from clients.config import Config
+
+# Log các truy vấn chậm (Cypher / filter Mongo) dạng JSON một dòng
+slow_log = logging.getLogger("slow_query")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "http_request_duration_seconds": "Thời gian xử lý request theo route",
+    "http_response_bytes_total": "Tổng số byte response theo route",
+    "backend_call_duration_seconds": "Thời gian gọi backend (neo4j / mongo)",
+    "backend_rows_total": "Tổng số dòng / document backend trả về",
+    "backend_errors_total": "Số lần gọi backend bị lỗi",
+    "backend_reply_bytes_total": "Tổng số byte backend trả về (BSON của reply MongoDB)",
+    "serialize_duration_seconds": "Thời gian encode JSON",
+    "serialize_bytes_total": "Tổng số byte JSON đã encode",
+    "cache_requests_total": "Số lần tra response cache theo kết quả",
+    "sync_docs_total": "Số node / rel đã đồng bộ từ Neo4j sang MongoDB",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) trên Windows sẽ kết thúc process; gunicorn cũng không chạy trên Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Registry:
+    """
+    Histogram + counter trong bộ nhớ của một worker.
+    Khi có METRICS_DIR, mỗi worker định kỳ ghi snapshot ra file để /metrics gộp lại;
+    file được xóa khi worker thoát, file của PID không còn chạy (worker bị kill) bị bỏ qua và dọn đi.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hist: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._last_flush = 0.0
+        # các thread ghi chung một file .tmp: chỉ một lần flush tại một thời điểm
+        self._flush_lock = threading.Lock()
+
+    def observe(self, name: str, labels: Dict[str, Any], value: float) -> None:
+        """Ghi một giá trị vào histogram: [bucket..., +Inf, sum]"""
+        with self._lock:
+            series = self._hist.setdefault(name, {})
+            h = series.get(_key(labels))
+            if h is None:
+                h = series[_key(labels)] = [0.0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    h[i] += 1
+            h[len(BUCKETS)] += 1
+            h[-1] += value
+        self._maybe_flush()
+
+    def inc(self, name: str, labels: Dict[str, Any], value: float = 1.0) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            k = _key(labels)
+            series[k] = series.get(k, 0.0) + value
+        self._maybe_flush()
+
+    # ---------- GỘP GIỮA CÁC WORKER ----------
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hist": {n: [[list(k), v] for k, v in s.items()] for n, s in self._hist.items()},
+                "counters": {n: [[list(k), v] for k, v in s.items()] for n, s in self._counters.items()},
+            }
+
+    def _path(self) -> str:
+        return os.path.join(Config.METRICS_DIR, f"metrics-{os.getpid()}.json")
+
+    def flush(self) -> None:
+        if not Config.METRICS_DIR:
+            return
+        with self._flush_lock:
+            self._write()
+
+    def _write(self) -> None:
+        os.makedirs(Config.METRICS_DIR, exist_ok=True)
+        tmp = self._path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, self._path())
+        self._last_flush = time.monotonic()
+
+    def _maybe_flush(self) -> None:
+        if not Config.METRICS_DIR or time.monotonic() - self._last_flush <= Config.METRICS_FLUSH_SECONDS:
+            return
+        # thread khác đang ghi thì bỏ qua, không bắt request chờ
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._last_flush > Config.METRICS_FLUSH_SECONDS:
+                self._write()
+        except OSError:
+            logging.getLogger(__name__).exception("Metrics: không ghi được snapshot")
+        finally:
+            self._flush_lock.release()
+
+    def remove(self) -> None:
+        """Xóa file snapshot của worker này (khi thoát) để không bị cộng mãi vào /metrics"""
+        if not Config.METRICS_DIR:
+            return
+        try:
+            os.remove(self._path())
+        except FileNotFoundError:
+            pass
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """Snapshot của mọi worker còn sống (chỉ worker hiện tại nếu không có METRICS_DIR)"""
+        if not Config.METRICS_DIR:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(Config.METRICS_DIR, "metrics-*.json")):
+            pid = os.path.basename(path)[len("metrics-"):-len(".json")]
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                # worker chết không kịp chạy atexit
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+
+def _merge(snapshots: Iterable[Dict[str, Any]]):
+    hist: Dict[str, Dict[LabelKey, List[float]]] = {}
+    counters: Dict[str, Dict[LabelKey, float]] = {}
+    for snap in snapshots:
+        for name, series in snap.get("hist", {}).items():
+            target = hist.setdefault(name, {})
+            for labels, values in series:
+                k = tuple(tuple(x) for x in labels)
+                cur = target.setdefault(k, [0.0] * len(values))
+                target[k] = [a + b for a, b in zip(cur, values)]
+        for name, series in snap.get("counters", {}).items():
+            target = counters.setdefault(name, {})
+            for labels, value in series:
+                k = tuple(tuple(x) for x in labels)
+                target[k] = target.get(k, 0.0) + value
+    return hist, counters
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: Iterable[Tuple[str, str]], extra: Tuple[str, str] | None = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(snapshots: Iterable[Dict[str, Any]]) -> str:
+    """Định dạng text của Prometheus"""
+    hist, counters = _merge(snapshots)
+    lines: List[str] = []
+    for name in sorted(hist):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, values in sorted(hist[name].items()):
+            # các bucket đã được cộng dồn khi observe
+            for bound, count in zip(BUCKETS, values):
+                lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', repr(bound)))} {_num(count)}")
+            cumulative = values[len(BUCKETS)]
+            lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', '+Inf'))} {_num(cumulative)}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {values[-1]:.6f}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {_num(cumulative)}")
+    for name in sorted(counters):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in sorted(counters[name].items()):
+            lines.append(f"{name}{_fmt_labels(labels)} {_num(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------------------------
+# HOOK CHO BACKEND
+# -------------------------------------------------
+def _truncate(value: Any, limit: int = 2000) -> str:
+    text = json.dumps(value, default=str, ensure_ascii=False)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def record_backend(backend: str, op: str, seconds: float, rows: int | None = None,
+                   error: bool = False, query: Any = None, params: Any = None,
+                   reply_bytes: int | None = None) -> None:
+    """Ghi thời gian / số dòng / số byte của một lời gọi backend, log lại nếu chậm"""
+    labels = {"backend": backend, "op": op}
+    registry.observe("backend_call_duration_seconds", labels, seconds)
+    if rows:
+        registry.inc("backend_rows_total", labels, rows)
+    if reply_bytes:
+        registry.inc("backend_reply_bytes_total", labels, reply_bytes)
+    if error:
+        registry.inc("backend_errors_total", labels)
+    if seconds * 1000 >= Config.SLOW_QUERY_MS:
+        slow_log.warning(json.dumps({
+            "backend": backend,
+            "op": op,
+            "ms": round(seconds * 1000, 1),
+            "rows": rows,
+            "error": error,
+            "query": _truncate(query),
+            "params": _truncate(params),
+        }, ensure_ascii=False))
+
+
+def log_profile(cypher: str, profile: Dict[str, Any] | None) -> None:
+    """Log kế hoạch PROFILE được lấy mẫu (tổng dbHits + cây operator)"""
+    if not profile:
+        return
+
+    def total_hits(p: Dict[str, Any]) -> int:
+        return p.get("dbHits", 0) + sum(total_hits(c) for c in p.get("children", []))
+
+    slow_log.warning(json.dumps({
+        "backend": "neo4j",
+        "op": "profile",
+        "query": _truncate(cypher),
+        "db_hits": total_hits(profile),
+        "rows": profile.get("rows"),
+        "plan": _truncate(profile, 8000),
+    }, ensure_ascii=False))
+
+
+# Instance dùng chung trong toàn ứng dụng
+registry = Registry()
+atexit.register(registry.remove)
@@ -0,0 +1,128 @@
+# services/pagination.py
+import base64
+import json
+from typing import Any, Dict, List, Tuple
+
+from bson import ObjectId
+
+# Các khóa ổn định, có index, dùng để phân trang keyset
+PAGE_KEYS = ("_id", "neo4j_id")
+
+# Toán tử được phép trong tham số ?filter= (không cho $where, $expr, ...)
+ALLOWED_OPERATORS = {
+    "$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin",
+    "$exists", "$and", "$or", "$elemMatch", "$all", "$size",
+}
+
+
+def parse_bool(raw: Any, default: bool, name: str) -> bool:
+    """Đọc tham số true/false (bool JSON hoặc chuỗi true/false/1/0); giá trị khác thì raise ValueError"""
+    if raw is None or raw == "":
+        return default
+    if isinstance(raw, bool):
+        return raw
+    value = str(raw).strip().lower()
+    if value in ("true", "1"):
+        return True
+    if value in ("false", "0"):
+        return False
+    raise ValueError(f"Tham số '{name}' phải là true hoặc false")
+
+
+def parse_int(raw: Any, default: int, name: str, maximum: int | None = None, minimum: int = 1) -> int:
+    """Đọc tham số số nguyên, kẹp vào [minimum, maximum]; không phải số thì raise ValueError"""
+    if raw is None or raw == "":
+        value = default
+    else:
+        try:
+            value = int(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"Tham số '{name}' phải là số nguyên")
+    if maximum is not None:
+        value = min(value, maximum)
+    return max(minimum, value)
+
+
+def encode_cursor(key: str, value: Any) -> str:
+    """Mã hóa vị trí cuối trang thành token 'next' (opaque cho client)"""
+    payload = {"k": key, "v": value}
+    if isinstance(value, ObjectId):
+        payload = {"k": key, "v": str(value), "t": "oid"}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[str, Any]:
+    """Giải mã token 'next' -> (key, value); token sai thì raise ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        key, value = payload["k"], payload["v"]
+        if payload.get("t") == "oid":
+            value = ObjectId(value)
+    except Exception:
+        raise ValueError("Token 'after' không hợp lệ")
+    if key not in PAGE_KEYS:
+        raise ValueError("Token 'after' không hợp lệ")
+    return key, value
+
+
+def parse_fields(fields: str | None) -> List[str]:
+    """'a,b.c' -> ['a', 'b.c']"""
+    if not fields:
+        return []
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
+
+def _check_filter(value: Any) -> None:
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if k.startswith("$") and k not in ALLOWED_OPERATORS:
+                raise ValueError(f"Toán tử không được phép trong filter: {k}")
+            _check_filter(v)
+    elif isinstance(value, list):
+        for v in value:
+            _check_filter(v)
+
+
+def parse_filter(raw: str | None) -> Dict[str, Any]:
+    """Đọc ?filter= (JSON object) và kiểm tra toán tử"""
+    if not raw:
+        return {}
+    try:
+        flt = json.loads(raw)
+    except ValueError:
+        raise ValueError("Tham số 'filter' phải là JSON")
+    if not isinstance(flt, dict):
+        raise ValueError("Tham số 'filter' phải là JSON object")
+    _check_filter(flt)
+    return flt
+
+
+def page_query(flt: Dict[str, Any], key: str, after: Any = None) -> Dict[str, Any]:
+    """Ghép filter người dùng với điều kiện keyset key > after"""
+    if after is None:
+        return flt
+    cond = {key: {"$gt": after}}
+    return {"$and": [flt, cond]} if flt else cond
+
+
+def page_projection(fields: List[str], key: str) -> Dict[str, int] | None:
+    """Projection luôn có khóa phân trang để tính token 'next'"""
+    if not fields:
+        return None
+    projection = {f: 1 for f in fields}
+    projection[key] = 1
+    if "_id" not in fields and key != "_id":
+        projection["_id"] = 0
+    return projection
+
+
+def clean_doc(doc: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Bỏ _id (ObjectId) trừ khi client yêu cầu trong fields"""
+    if "_id" in doc:
+        if fields and "_id" in fields:
+            doc["_id"] = str(doc["_id"])
+        else:
+            del doc["_id"]
+    return doc
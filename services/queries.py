@@ -0,0 +1,237 @@
+# services/queries.py
+"""
+Phần dùng chung giữa app.py (Flask) và asgi.py (Starlette) cho các route tìm kiếm / truy vấn:
+Cypher, bộ lọc MongoDB, đọc tham số và các hàm xử lý kết quả không gọi backend.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+from bson import ObjectId
+
+from clients.config import Config
+from services import pagination
+from services.graph_snapshot import graph_snapshot
+
+NODES_CYPHER = "MATCH (n) RETURN n LIMIT $limit"
+
+SEARCH_CYPHER = """
+MATCH (n)
+WHERE exists(n.rdfs__label)
+  AND toLower(n.rdfs__label) CONTAINS toLower($q)
+
+OPTIONAL MATCH (n)-[r]->(m)
+
+RETURN DISTINCT
+  n {.*, label: n.rdfs__label, labels: labels(n)} AS node,
+  collect(DISTINCT {
+    type: type(r),
+    target_label: coalesce(m.rdfs__label, ""),
+    target_labels: labels(m)
+  }) AS relations
+"""
+
+
+SEARCH_BY_IDS_CYPHER = """
+UNWIND range(0, size($ids) - 1) AS i
+MATCH (n)
+WHERE id(n) = $ids[i]
+
+OPTIONAL MATCH (n)-[r]->(m)
+
+WITH i, n, collect(DISTINCT {
+    type: type(r),
+    target_label: coalesce(m.rdfs__label, ""),
+    target_labels: labels(m)
+  }) AS relations
+RETURN
+  $ids[i] AS nid,
+  n {.*, label: n.rdfs__label, labels: labels(n)} AS node,
+  relations
+ORDER BY i
+"""
+
+
+SEARCH_BATCH_CYPHER = """
+UNWIND $terms AS term
+MATCH (n)
+WHERE n.rdfs__label IS NOT NULL
+  AND toLower(n.rdfs__label) CONTAINS toLower(term)
+
+OPTIONAL MATCH (n)-[r]->(m)
+
+WITH term, n, collect(DISTINCT {
+    type: type(r),
+    target_label: coalesce(m.rdfs__label, ""),
+    target_labels: labels(m)
+  }) AS relations
+RETURN
+  term,
+  n {.*, label: n.rdfs__label, labels: labels(n)} AS node,
+  relations
+"""
+
+
+# Khi graph_snapshot đã nạp xong: chỉ lấy node từ Neo4j, quan hệ lấy từ snapshot
+SEARCH_NODES_CYPHER = """
+MATCH (n)
+WHERE n.rdfs__label IS NOT NULL
+  AND toLower(n.rdfs__label) CONTAINS toLower($q)
+RETURN
+  id(n) AS nid,
+  n {.*, label: n.rdfs__label, labels: labels(n)} AS node
+"""
+
+
+SEARCH_NODES_BY_IDS_CYPHER = """
+UNWIND range(0, size($ids) - 1) AS i
+MATCH (n)
+WHERE id(n) = $ids[i]
+RETURN
+  $ids[i] AS nid,
+  n {.*, label: n.rdfs__label, labels: labels(n)} AS node
+ORDER BY i
+"""
+
+
+SEARCH_BATCH_NODES_CYPHER = """
+UNWIND $terms AS term
+MATCH (n)
+WHERE n.rdfs__label IS NOT NULL
+  AND toLower(n.rdfs__label) CONTAINS toLower(term)
+RETURN
+  term,
+  id(n) AS nid,
+  n {.*, label: n.rdfs__label, labels: labels(n)} AS node
+"""
+
+
+# -------------------------------------------------
+# ĐỌC THAM SỐ
+# -------------------------------------------------
+def parse_max_rows(raw: Any) -> int:
+    """max_rows của /neo4j/query: kẹp vào [1, NEO4J_QUERY_MAX_ROWS]; không phải số thì raise ValueError"""
+    return pagination.parse_int(raw, Config.NEO4J_QUERY_MAX_ROWS, "max_rows", Config.NEO4J_QUERY_MAX_ROWS)
+
+
+# -------------------------------------------------
+# CACHE / SNAPSHOT
+# -------------------------------------------------
+def cacheable(value: Tuple[Dict[str, Any], int]) -> bool:
+    """Chỉ cache response thành công và đầy đủ (không lỗi, không timeout)"""
+    payload, status = value
+    if status != 200:
+        return False
+    return not any(k in payload for k in ("timed_out", "neo4j_error", "mongo_error"))
+
+
+def snapshot_ready() -> bool:
+    return Config.GRAPH_SNAPSHOT_ENABLED and graph_snapshot.ready
+
+
+def with_relations(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Gắn quan hệ từ graph_snapshot cho các dòng của *_NODES_CYPHER (có cột nid)"""
+    for row in rows:
+        row["relations"] = graph_snapshot.relations(row.get("nid"))
+    return rows
+
+
+# -------------------------------------------------
+# KẾT QUẢ TÌM KIẾM
+# -------------------------------------------------
+def neo4j_ids(ids: Iterable[Any]) -> List[Any]:
+    """neo4j_id trong mongo có thể là chuỗi số, Neo4j cần số nguyên"""
+    return [int(i) if isinstance(i, str) and i.isdigit() else i for i in ids]
+
+
+def search_results(rows: Iterable[Dict[str, Any]], with_id: bool = False) -> List[Dict[str, Any]]:
+    """Dòng Neo4j -> {"node", "relations"} (thêm "nid" nếu with_id)"""
+    results = []
+    for row in rows:
+        item = {"node": row.get("node"), "relations": row.get("relations", [])}
+        if with_id:
+            item["nid"] = row.get("nid")
+        results.append(item)
+    return results
+
+
+def mongo_nodes_filter(q: str) -> Dict[str, Any]:
+    """
+    Tìm node trong mongo theo props.rdfs__label hoặc labels.
+    q là chuỗi con (giống CONTAINS bên Neo4j), không phải regex: ký tự đặc biệt được escape.
+    """
+    pattern = re.escape(q)
+    return {
+        "$or": [
+            {"props.rdfs__label": {"$regex": pattern, "$options": "i"}},
+            {"labels": {"$elemMatch": {"$regex": pattern, "$options": "i"}}}
+        ]
+    }
+
+
+def mongo_rels_filter(neo_ids: List[Any], rel_ids: List[Any] | None = None) -> Dict[str, Any]:
+    """
+    Tìm rel trong mongo nối với các node đã tìm được.
+    rel_ids: id các rel kề lấy từ graph_snapshot, truy vấn theo khóa thay vì quét $or.
+    """
+    if rel_ids is not None:
+        # snapshot dùng _id cho rel không có neo4j_id: tra các id đó theo _id
+        oids = [i for i in rel_ids if isinstance(i, ObjectId)]
+        keys = [i for i in rel_ids if not isinstance(i, ObjectId)]
+        if not oids:
+            return {"neo4j_id": {"$in": keys}}
+        if not keys:
+            return {"_id": {"$in": oids}}
+        return {"$or": [{"neo4j_id": {"$in": keys}}, {"_id": {"$in": oids}}]}
+    return {
+        "$or": [
+            {"start_neo4j_id": {"$in": neo_ids}},
+            {"end_neo4j_id": {"$in": neo_ids}}
+        ]
+    }
+
+
+def sort_by_ids(docs: List[Dict[str, Any]], ids: List[Any]) -> List[Dict[str, Any]]:
+    """Xếp document theo thứ tự neo4j_id của label_index (giữ thứ hạng)"""
+    order = {nid: i for i, nid in enumerate(ids)}
+    docs.sort(key=lambda d: order.get(d.get("neo4j_id"), len(order)))
+    return docs
+
+
+def search_flags(neo4j_error: str | None, mongo_error: str | None,
+                 timed_out: List[str]) -> Dict[str, Any]:
+    """Các cờ lỗi / timeout gắn vào response tìm kiếm"""
+    flags: Dict[str, Any] = {}
+    if neo4j_error:
+        flags["neo4j_error"] = neo4j_error
+    if mongo_error:
+        flags["mongo_error"] = mongo_error
+    if timed_out:
+        flags["timed_out"] = timed_out
+    return flags
+
+
+def search_response(q: str, neo4j_results, mongo_nodes, mongo_rels,
+                    flags: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    resp = {
+        "query": q,
+        "neo4j_results": neo4j_results,
+        "mongo_nodes": mongo_nodes,
+        "mongo_rels": mongo_rels,
+    }
+    resp.update(flags)
+    return resp, 200
+
+
+def doc_matches(doc: Dict[str, Any], term: str) -> bool:
+    """Document 'nodes' có khớp term (giống điều kiện regex của mongo_nodes_filter)"""
+    pattern = re.compile(re.escape(term), re.IGNORECASE)
+    label = (doc.get("props") or {}).get("rdfs__label")
+    values = (label if isinstance(label, list) else [label]) + list(doc.get("labels") or [])
+    return any(isinstance(v, str) and pattern.search(v) for v in values)
+
+
+def split_rels(mongo_rels: List[Dict[str, Any]], ids: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Các rel trong mongo_rels nối với một trong các node ids"""
+    ids = set(ids)
+    return [r for r in mongo_rels
+            if r.get("start_neo4j_id") in ids or r.get("end_neo4j_id") in ids]
@@ -0,0 +1,336 @@
+# services/search_index.py
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+from clients.config import Config
+from services.sync import advance_marks, changed_filter, graph_sync, new_marks
+
+logger = logging.getLogger(__name__)
+
+NGRAM = 3
+
+# Thứ hạng khớp: số nhỏ hơn xếp trước
+RANK_EXACT = 0
+RANK_PREFIX = 1
+RANK_WORD_PREFIX = 2
+RANK_SUBSTRING = 3
+
+
+def normalize_text(text: Any) -> str:
+    """
+    Chuẩn hóa chuỗi để so khớp: bỏ dấu tiếng Việt, chữ thường, gộp khoảng trắng.
+    "Sầu Riêng" -> "sau rieng"
+    """
+    if text is None:
+        return ""
+    s = unicodedata.normalize("NFD", str(text))
+    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
+    s = s.replace("đ", "d").replace("Đ", "D")
+    return " ".join(s.lower().split())
+
+
+def ngrams(text: str, padded: bool = True) -> Set[str]:
+    """Tập n-gram của chuỗi đã chuẩn hóa; padded thêm khoảng trắng ở biên từ"""
+    if padded:
+        text = f" {text} "
+    if len(text) < NGRAM:
+        return set()
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def doc_terms(doc: Dict[str, Any]) -> Tuple[str, ...]:
+    """Các chuỗi được index của một document 'nodes': rdfs__label + labels"""
+    props = doc.get("props") or {}
+    terms = [normalize_text(v) for v in _as_list(props.get("rdfs__label"))]
+    terms += [normalize_text(v) for v in _as_list(doc.get("labels"))]
+    return tuple(dict.fromkeys(t for t in terms if t))
+
+
+def _similarity(q: str, q_grams: Set[str], term: str) -> float:
+    """Hệ số Dice n-gram giữa truy vấn và đoạn cùng số từ giống nhất trong chuỗi được index"""
+    words = term.split()
+    n = len(q.split())
+    best = 0.0
+    for i in range(max(1, len(words) - n + 1)):
+        grams = ngrams(" ".join(words[i:i + n]))
+        if grams:
+            best = max(best, 2 * len(q_grams & grams) / (len(q_grams) + len(grams)))
+    return best
+
+
+class LabelIndex:
+    """
+    Inverted index n-gram trong bộ nhớ cho collection 'nodes'.
+    Ánh xạ chuỗi tìm kiếm -> neo4j_id, hỗ trợ khớp prefix, substring và fuzzy.
+    Exact / prefix tra trực tiếp trên map chuỗi -> neo4j_id (+ danh sách chuỗi đã sort), nên không
+    phụ thuộc số ứng viên n-gram; substring mới cần xếp hạng qua postings.
+    Đọc không cần lock: build / refresh dựng dict mới (copy-on-write) rồi hoán đổi
+    cả bộ dữ liệu một lần; lock chỉ để các lần ghi không chạy chồng nhau.
+    Chỉ thread nền gọi build / refresh; nơi khác (vd. sau khi sync) gọi request_rebuild().
+    """
+
+    PROJECTION = {"_id": 1, "neo4j_id": 1, "labels": 1, "props.rdfs__label": 1, "synced_at": 1}
+
+    def __init__(self, get_collection: Callable[[], Any],
+                 get_generation: Callable[[], Any] = lambda: None) -> None:
+        self._get_collection = get_collection
+        # đổi giá trị (lượt sync mới xong ở worker bất kỳ) thì nạp lại toàn bộ
+        self._get_generation = get_generation
+        self._generation = None
+        self._rebuild = threading.Event()
+        self._lock = threading.RLock()
+        # (terms, postings, exact, sorted_terms): terms neo4j_id -> các chuỗi, postings n-gram -> tập
+        # neo4j_id, exact chuỗi -> tập neo4j_id, sorted_terms các chuỗi của exact theo thứ tự (tra prefix)
+        self._data: Tuple[Dict[Any, Tuple[str, ...]], Dict[str, Set[Any]],
+                          Dict[str, Set[Any]], List[str]] = ({}, {}, {}, [])
+        self._marks = new_marks()
+        self._last_full_build = 0.0
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self.ready = False
+
+    # ---------- XÂY DỰNG / CẬP NHẬT ----------
+    @staticmethod
+    def _posting(postings: Dict[str, Set[Any]], gram: str, owned: Set[str] | None) -> Set[Any]:
+        """Tập neo4j_id của gram để ghi; owned khác None thì chép tập cũ trước (copy-on-write)"""
+        ids = postings.get(gram)
+        if owned is None:
+            return ids if ids is not None else postings.setdefault(gram, set())
+        if gram not in owned:
+            ids = postings[gram] = set(ids or ())
+            owned.add(gram)
+        return ids
+
+    def _add(self, terms: Dict[Any, Tuple[str, ...]], postings: Dict[str, Set[Any]],
+             exact: Dict[str, Set[Any]], neo4j_id: Any, values: Tuple[str, ...],
+             owned: Tuple[Set[str], Set[str]] | None = None) -> None:
+        owned_grams, owned_terms = owned or (None, None)
+        old = terms.get(neo4j_id)
+        if old:
+            for gram in set().union(*(ngrams(t) for t in old)):
+                if gram in postings:
+                    ids = self._posting(postings, gram, owned_grams)
+                    ids.discard(neo4j_id)
+                    if not ids:
+                        del postings[gram]
+            for t in old:
+                if t in exact:
+                    ids = self._posting(exact, t, owned_terms)
+                    ids.discard(neo4j_id)
+                    if not ids:
+                        del exact[t]
+        terms[neo4j_id] = values
+        for t in values:
+            self._posting(exact, t, owned_terms).add(neo4j_id)
+            for gram in ngrams(t):
+                self._posting(postings, gram, owned_grams).add(neo4j_id)
+
+    def _load(self, docs: Iterable[Dict[str, Any]], terms, postings, exact, marks: Dict[str, Any],
+              owned: Tuple[Set[str], Set[str]] | None = None) -> int:
+        count = 0
+        for doc in docs:
+            advance_marks(marks, doc)
+            if "neo4j_id" not in doc:
+                continue
+            values = doc_terms(doc)
+            if values:
+                self._add(terms, postings, exact, doc["neo4j_id"], values, owned)
+                count += 1
+        return count
+
+    def build(self) -> int:
+        """Nạp lại toàn bộ index từ MongoDB rồi hoán đổi"""
+        col = self._get_collection()
+        cursor = col.find({}, self.PROJECTION).sort("_id", 1).batch_size(Config.SEARCH_INDEX_BATCH_SIZE)
+        terms: Dict[Any, Tuple[str, ...]] = {}
+        postings: Dict[str, Set[Any]] = {}
+        exact: Dict[str, Set[Any]] = {}
+        marks = new_marks()
+        count = self._load(cursor, terms, postings, exact, marks)
+        with self._lock:
+            self._data = (terms, postings, exact, sorted(exact))
+            self._marks = marks
+            self._last_full_build = time.monotonic()
+            self.ready = True
+        logger.info("Search index: đã nạp %d node", count)
+        return count
+
+    def refresh(self) -> int:
+        """Nạp các document mới hoặc được sync ghi lại (services.sync.changed_filter) kể từ lần nạp trước"""
+        if not self.ready:
+            return self.build()
+        with self._lock:
+            marks = dict(self._marks)
+        col = self._get_collection()
+        # đọc MongoDB ngoài lock, giống GraphSnapshot.refresh
+        docs = list(col.find(changed_filter(marks), self.PROJECTION).sort("_id", 1))
+        if not docs:
+            return 0
+        with self._lock:
+            terms, postings, exact, _ = self._data
+            # chép nông rồi chỉ chép các tập bị sửa: request đang đọc bản cũ không bị ảnh hưởng
+            terms, postings, exact = dict(terms), dict(postings), dict(exact)
+            count = self._load(docs, terms, postings, exact, marks, owned=(set(), set()))
+            self._data = (terms, postings, exact, sorted(exact))
+            self._marks = marks
+            return count
+
+    def request_rebuild(self) -> None:
+        """Báo thread nền nạp lại toàn bộ ngay (không chờ hết chu kỳ refresh)"""
+        self._rebuild.set()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                generation = self._get_generation()
+                stale = time.monotonic() - self._last_full_build > Config.SEARCH_INDEX_REBUILD_SECONDS
+                if not self.ready or stale or self._rebuild.is_set() or generation != self._generation:
+                    # node bị xóa / đổi tên chỉ biến mất khỏi index khi nạp lại toàn bộ
+                    self._rebuild.clear()
+                    self.build()
+                    self._generation = generation
+                else:
+                    self.refresh()
+            except Exception:
+                logger.exception("Search index: lỗi khi nạp dữ liệu")
+            self._rebuild.wait(Config.SEARCH_INDEX_REFRESH_SECONDS)
+
+    def ensure_started(self) -> None:
+        """Khởi động thread nạp/cập nhật index (một lần cho mỗi process worker)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="search-index", daemon=True)
+            self._thread.start()
+
+    # ---------- TRA CỨU ----------
+    @staticmethod
+    def _rank(q: str, values: Tuple[str, ...]) -> Tuple[int, int] | None:
+        """(thứ hạng, độ dài chuỗi khớp) tốt nhất của node, None nếu không khớp"""
+        best = None
+        for t in values:
+            if t == q:
+                rank = RANK_EXACT
+            elif t.startswith(q):
+                rank = RANK_PREFIX
+            elif f" {q}" in f" {t}":
+                rank = RANK_WORD_PREFIX
+            elif q in t:
+                rank = RANK_SUBSTRING
+            else:
+                continue
+            if best is None or (rank, len(t)) < best:
+                best = (rank, len(t))
+        return best
+
+    @staticmethod
+    def _candidates(q: str, postings: Dict[str, Set[Any]]) -> Set[Any]:
+        """Các neo4j_id có thể khớp q (không cắt bớt: exact / prefix có thể nằm bất kỳ đâu trong tập)"""
+        if len(q) >= NGRAM:
+            grams = sorted(ngrams(q, padded=False), key=lambda g: len(postings.get(g, ())))
+            if not grams or grams[0] not in postings:
+                return set()
+            result = set(postings[grams[0]])
+            for g in grams[1:]:
+                result &= postings.get(g, set())
+                if not result:
+                    break
+        else:
+            # chuỗi ngắn: chỉ khớp đầu từ, gom các gram bắt đầu bằng " q"
+            head = f" {q}"
+            result = set()
+            for gram, ids in list(postings.items()):
+                if gram.startswith(head):
+                    result |= ids
+        return result
+
+    @staticmethod
+    def _fuzzy(q: str, terms, postings, limit: int) -> List[Tuple[float, Any]]:
+        q_grams = ngrams(q)
+        if not q_grams:
+            return []
+        counts: Dict[Any, int] = {}
+        for g in q_grams:
+            ids = postings.get(g, ())
+            # gram quá phổ biến (" ca", "ng ") không phân biệt được gì, chỉ tốn thời gian đếm
+            if len(ids) > Config.SEARCH_INDEX_MAX_CANDIDATES:
+                continue
+            for nid in ids:
+                counts[nid] = counts.get(nid, 0) + 1
+        top = heapq.nlargest(limit * 4, counts.items(), key=lambda kv: kv[1])
+        scored = []
+        for nid, _ in top:
+            score = max((_similarity(q, q_grams, t) for t in terms.get(nid, ())), default=0.0)
+            if score >= Config.SEARCH_INDEX_FUZZY_THRESHOLD:
+                scored.append((score, nid))
+        scored.sort(key=lambda x: -x[0])
+        return scored[:limit]
+
+    def search(self, query: str, limit: int) -> List[Any]:
+        """
+        Trả về danh sách neo4j_id đã xếp hạng (exact > prefix > substring).
+        Fuzzy chỉ chạy khi số kết quả khớp ít hơn SEARCH_INDEX_FUZZY_BELOW (mặc định: không có kết quả nào).
+        """
+        q = normalize_text(query)
+        if not q:
+            return []
+        terms, postings, exact, sorted_terms = self._data
+
+        # ========== EXACT + PREFIX: TRA THẲNG TRÊN CHUỖI ==========
+        ids = list(exact.get(q, ()))[:limit]
+        if len(ids) < limit:
+            # các chuỗi bắt đầu bằng q nằm liền nhau trong sorted_terms; lấy các chuỗi ngắn nhất
+            lo = bisect.bisect_right(sorted_terms, q)
+            hi = bisect.bisect_left(sorted_terms, q + "\uffff", lo)
+            seen = set(ids)
+            for t in heapq.nsmallest(limit, sorted_terms[lo:hi], key=len):
+                for nid in exact.get(t, ()):
+                    if nid not in seen and len(ids) < limit:
+                        seen.add(nid)
+                        ids.append(nid)
+        if len(ids) >= limit:
+            return ids
+
+        # ========== SUBSTRING: XẾP HẠNG MỌI ỨNG VIÊN BẰNG HEAP GIỚI HẠN ==========
+        matched = 0
+
+        def ranked():
+            nonlocal matched
+            for nid in self._candidates(q, postings):
+                best = self._rank(q, terms.get(nid, ()))
+                if best is not None:
+                    matched += 1
+                    yield best, nid
+
+        top = heapq.nsmallest(limit, ranked(), key=lambda x: x[0])
+        ids = [nid for _, nid in top]
+        if matched < Config.SEARCH_INDEX_FUZZY_BELOW:
+            seen = set(ids)
+            ids += [nid for _, nid in self._fuzzy(q, terms, postings, limit) if nid not in seen][:limit - len(ids)]
+        return ids
+
+
+# Instance dùng chung trong toàn ứng dụng (nạp dữ liệu khi gọi ensure_started)
+def _nodes_collection():
+    from clients.mongo_client import mongo_client
+    return mongo_client.get_collection("nodes")
+
+
+label_index = LabelIndex(_nodes_collection, graph_sync.generation)
@@ -0,0 +1,164 @@
+# services/serializer.py
+import base64
+import datetime
+import decimal
+import json
+import time
+import uuid
+from collections.abc import Mapping
+from typing import Any, Callable, Dict
+
+from bson import Decimal128, ObjectId
+from flask import Response
+from neo4j.graph import Node, Path, Relationship
+from neo4j.spatial import Point
+from neo4j.time import Date, DateTime, Duration, Time
+
+from clients.config import Config
+from services import metrics
+
+try:  # backend JSON nhanh (tùy chọn)
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+# -------------------------------------------------
+# CHUYỂN ĐỔI KIỂU NEO4J / BSON
+# -------------------------------------------------
+def node_to_dict(n: Node) -> Dict[str, Any]:
+    return {
+        "id": n.id,
+        "labels": list(n.labels),
+        "properties": dict(n),
+    }
+
+
+def relationship_to_dict(r: Relationship) -> Dict[str, Any]:
+    return {
+        "id": r.id,
+        "type": r.type,
+        "start_node_id": r.start_node.id,
+        "end_node_id": r.end_node.id,
+        "properties": dict(r),
+    }
+
+
+def path_to_dict(p: Path) -> Dict[str, Any]:
+    return {
+        "nodes": list(p.nodes),
+        "relationships": list(p.relationships),
+    }
+
+
+def point_to_dict(p: Point) -> Dict[str, Any]:
+    d = {"srid": p.srid, "x": p.x, "y": p.y}
+    if len(p) > 2:
+        d["z"] = p.z
+    return d
+
+
+# Hàm chuyển đổi theo kiểu; kết quả có thể còn chứa kiểu đặc biệt,
+# encoder sẽ gọi lại _default cho các giá trị lồng nhau (một lượt duy nhất).
+_HANDLERS: Dict[type, Callable[[Any], Any]] = {
+    Node: node_to_dict,
+    Relationship: relationship_to_dict,
+    Path: path_to_dict,
+    Point: point_to_dict,
+    Date: lambda v: v.iso_format(),
+    DateTime: lambda v: v.iso_format(),
+    Time: lambda v: v.iso_format(),
+    Duration: lambda v: v.iso_format(),
+    ObjectId: str,
+    Decimal128: str,
+    decimal.Decimal: str,
+    uuid.UUID: str,
+    datetime.datetime: lambda v: v.isoformat(),
+    datetime.date: lambda v: v.isoformat(),
+    datetime.time: lambda v: v.isoformat(),
+    bytes: lambda v: base64.b64encode(v).decode(),
+    set: list,
+    frozenset: list,
+}
+
+
+def register(type_: type, handler: Callable[[Any], Any]) -> None:
+    """Đăng ký cách serialize cho một kiểu mới"""
+    _HANDLERS[type_] = handler
+
+
+def _find_handler(t: type) -> Callable[[Any], Any] | None:
+    handler = _HANDLERS.get(t)
+    if handler is None:
+        # lớp con (vd. mỗi loại Relationship là một lớp con riêng) -> nhớ lại handler
+        for base, h in list(_HANDLERS.items()):
+            if issubclass(t, base):
+                handler = _HANDLERS[t] = h
+                break
+    return handler
+
+
+def _default(v: Any) -> Any:
+    handler = _find_handler(type(v))
+    if handler is not None:
+        return handler(v)
+    if isinstance(v, Mapping):
+        return dict(v)
+    if isinstance(v, (list, tuple)):
+        return list(v)
+    return str(v)
+
+
+_NATIVE = (str, int, float, bool, type(None))
+_NATIVE_TYPES = frozenset(_NATIVE)
+
+
+def to_jsonable(v: Any) -> Any:
+    """Chuyển đệ quy sang kiểu JSON thuần (dùng cho backend json chuẩn)"""
+    t = type(v)
+    if t in _NATIVE_TYPES:
+        return v
+    if t is dict:
+        return {
+            k if type(k) is str else str(k): x if type(x) in _NATIVE_TYPES else to_jsonable(x)
+            for k, x in v.items()
+        }
+    if t is list or t is tuple:
+        return [x if type(x) in _NATIVE_TYPES else to_jsonable(x) for x in v]
+    # Duration / Point là lớp con của tuple nên phải xét handler trước
+    if _find_handler(t) is None and isinstance(v, _NATIVE):
+        return v
+    return to_jsonable(_default(v))
+
+
+# -------------------------------------------------
+# ENCODE
+# -------------------------------------------------
+def _use_orjson() -> bool:
+    if Config.JSON_BACKEND == "json":
+        return False
+    return orjson is not None
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize obj thành JSON (UTF-8) trong một lượt"""
+    started = time.perf_counter()
+    if _use_orjson():
+        data = orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        data = json.dumps(to_jsonable(obj), ensure_ascii=False, separators=(",", ":")).encode()
+    if Config.METRICS_ENABLED:
+        backend = {"backend": "orjson" if _use_orjson() else "json"}
+        metrics.registry.observe("serialize_duration_seconds", backend, time.perf_counter() - started)
+        metrics.registry.inc("serialize_bytes_total", backend, len(data))
+    return data
+
+
+def dumps_line(obj: Any) -> bytes:
+    """Một dòng NDJSON"""
+    return dumps(obj) + b"\n"
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    """Thay cho jsonify: dùng serializer chung cho mọi kiểu Neo4j / BSON"""
+    return Response(dumps(payload), status=status, mimetype="application/json")
@@ -0,0 +1,463 @@
+# services/sync.py
+"""
+Đồng bộ đồ thị Neo4j sang bản sao trong MongoDB (collection 'nodes' / 'rels').
+
+    python -m services.sync                 # incremental, chạy tiếp checkpoint dở nếu có
+    python -m services.sync --full          # đồng bộ lại toàn bộ, xóa document không còn trong Neo4j
+    python -m services.sync --indexes-only  # chỉ tạo index hỗ trợ
+
+- Node / rel được đọc từ Neo4j theo thứ tự id tăng dần (stream, fetch_size = batch size).
+- Mỗi batch được ghi bằng bulk_write các UpdateOne(upsert=True), ordered=False.
+- Sau mỗi batch, vị trí hiện tại được lưu vào collection 'sync_state' để chạy tiếp khi bị ngắt.
+- Chỉ một lượt sync chạy tại một thời điểm (mọi worker / CLI): lượt chạy giữ lease trong document
+  'sync_state', gia hạn sau mỗi batch; lease hết hạn (SYNC_LEASE_SECONDS) thì lượt khác được nhận.
+- incremental: nếu có SYNC_UPDATED_PROPERTY (vd. updated_at = timestamp() khi ghi Neo4j) thì lấy
+  các node / rel đổi từ lần chạy trước; nếu không thì chỉ lấy node / rel có id mới hơn.
+  Giới hạn của chế độ theo id: Neo4j dùng lại id của node / rel đã xóa, nên entity mới nhận id cũ
+  (<= max id lượt trước) sẽ bị bỏ sót. Khi đó cần SYNC_UPDATED_PROPERTY hoặc chạy --full định kỳ.
+- neo4j_id được ghi cùng kiểu bản sao đang dùng (số nguyên hoặc chuỗi số, xem services.queries.neo4j_ids)
+  để upsert không tạo document trùng mà unique index không bắt được.
+"""
+import argparse
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from clients.config import Config
+from services import metrics
+from services.serializer import to_jsonable
+
+logger = logging.getLogger(__name__)
+
+STATE_ID = "graph"
+LEASE_FIELDS = ("_id", "lease_owner", "lease_expires")
+FULL = "full"
+INCREMENTAL = "incremental"
+
+SYNC_NODES_CYPHER = """
+MATCH (n)
+WHERE id(n) > $after
+  AND ($since IS NULL OR n[$prop] >= $since)
+RETURN id(n) AS id, labels(n) AS labels, properties(n) AS props
+ORDER BY id
+"""
+
+SYNC_RELS_CYPHER = """
+MATCH (a)-[r]->(b)
+WHERE id(r) > $after
+  AND ($since IS NULL OR r[$prop] >= $since)
+RETURN id(r) AS id, type(r) AS type, id(a) AS start, id(b) AS end, properties(r) AS props
+ORDER BY id
+"""
+
+# neo4j_id là khóa upsert nên unique; partial để các document cũ thiếu neo4j_id (xem user-011,
+# graph_snapshot dùng _id cho rel thiếu neo4j_id) không làm hỏng việc tạo index
+UNIQUE_NEO4J_ID = {"unique": True, "partialFilterExpression": {"neo4j_id": {"$exists": True}}}
+
+# (collection, các key) của index hỗ trợ API + sync
+INDEXES = [
+    ("nodes", [("neo4j_id", ASCENDING)], UNIQUE_NEO4J_ID),
+    ("nodes", [("labels", ASCENDING)], {}),
+    ("nodes", [("props.rdfs__label", ASCENDING)], {}),
+    ("rels", [("neo4j_id", ASCENDING)], UNIQUE_NEO4J_ID),
+    ("rels", [("start_neo4j_id", ASCENDING)], {}),
+    ("rels", [("end_neo4j_id", ASCENDING)], {}),
+    ("rels", [("type", ASCENDING)], {}),
+    # refresh của search_index / graph_snapshot và _prune lọc theo synced_at
+    ("nodes", [("synced_at", ASCENDING)], {}),
+    ("rels", [("synced_at", ASCENDING)], {}),
+]
+
+
+# -------------------------------------------------
+# WATERMARK CHO SEARCH_INDEX / GRAPH_SNAPSHOT
+# -------------------------------------------------
+def new_marks() -> Dict[str, Any]:
+    """_id và synced_at lớn nhất đã nạp; None = chưa nạp gì"""
+    return {"_id": None, "synced_at": None}
+
+
+def changed_filter(marks: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Document mới (_id lớn hơn) hoặc được sync ghi lại (synced_at lớn hơn) kể từ watermark.
+    Document của lượt sync đang chạy có cùng synced_at nên có thể bị bỏ sót ở giữa lượt;
+    khi lượt xong finished_at đổi và index / snapshot được nạp lại toàn bộ.
+    """
+    if marks["_id"] is None:
+        return {}
+    # chưa document nào có synced_at: document đầu tiên được sync ghi đều là thay đổi
+    synced = {"$exists": True} if marks["synced_at"] is None else {"$gt": marks["synced_at"]}
+    return {"$or": [{"_id": {"$gt": marks["_id"]}}, {"synced_at": synced}]}
+
+
+def advance_marks(marks: Dict[str, Any], doc: Dict[str, Any]) -> None:
+    for key in marks:
+        value = doc.get(key)
+        if value is not None and (marks[key] is None or value > marks[key]):
+            marks[key] = value
+
+
+class SyncBusy(RuntimeError):
+    """Lượt sync khác (worker / process khác) đang giữ lease"""
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _lease_until() -> datetime.datetime:
+    return _now() + datetime.timedelta(seconds=Config.SYNC_LEASE_SECONDS)
+
+
+def _aware(value: Any) -> Any:
+    # pymongo trả datetime không có tzinfo (UTC)
+    if isinstance(value, datetime.datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+# kiểu neo4j_id trong bản sao -> hàm chuyển id của Neo4j
+ID_FORMATS: Dict[str, Callable[[int], Any]] = {"int": int, "str": str}
+
+
+def node_doc(row: Dict[str, Any], synced_at: datetime.datetime,
+             key: Callable[[int], Any] = int) -> Dict[str, Any]:
+    return {
+        "neo4j_id": key(row["id"]),
+        "labels": list(row.get("labels") or []),
+        "props": to_jsonable(row.get("props") or {}),
+        "synced_at": synced_at,
+    }
+
+
+def rel_doc(row: Dict[str, Any], synced_at: datetime.datetime,
+            key: Callable[[int], Any] = int) -> Dict[str, Any]:
+    return {
+        "neo4j_id": key(row["id"]),
+        "type": row.get("type"),
+        "start_neo4j_id": key(row["start"]),
+        "end_neo4j_id": key(row["end"]),
+        "props": to_jsonable(row.get("props") or {}),
+        "synced_at": synced_at,
+    }
+
+
+class GraphSync:
+    """
+    Đồng bộ Neo4j -> MongoDB theo batch có checkpoint.
+    Chỉ lượt giữ lease trong 'sync_state' mới được ghi checkpoint.
+    """
+
+    PHASES = (("nodes", SYNC_NODES_CYPHER, node_doc), ("rels", SYNC_RELS_CYPHER, rel_doc))
+
+    def __init__(self, get_collection: Callable[[str], Any], get_neo4j: Callable[[], Any]) -> None:
+        self._get_collection = get_collection
+        self._get_neo4j = get_neo4j
+        self._lock = threading.Lock()
+        self._running = False
+        self._progress: Dict[str, Any] = {}
+        self._resumed_from = 0
+        self._token: str | None = None
+        self.last_result: Dict[str, Any] | None = None
+
+    # ---------- INDEX / CHECKPOINT ----------
+    def ensure_indexes(self) -> List[str]:
+        """
+        Tạo các index hỗ trợ. Index unique không tạo được (vd. dữ liệu cũ bị trùng neo4j_id) thì tạo
+        index thường cùng key: thiếu index, mỗi upsert của _write sẽ quét cả collection.
+        """
+        created = []
+        for name, keys, options in INDEXES:
+            col = self._get_collection(name)
+            try:
+                created.append(f"{name}.{col.create_index(keys, **options)}")
+                continue
+            except OperationFailure as e:
+                logger.warning("Sync: không tạo được index %s %s %s: %s", name, keys, options, e)
+            if not options.get("unique"):
+                continue
+            try:
+                created.append(f"{name}.{col.create_index(keys)}")
+            except OperationFailure as e:
+                # thường là đã có index cùng key với option khác: vẫn dùng được cho upsert
+                logger.warning("Sync: không tạo được index thường %s %s: %s", name, keys, e)
+        return created
+
+    def _states(self):
+        return self._get_collection(Config.SYNC_STATE_COLLECTION)
+
+    def _state(self) -> Dict[str, Any] | None:
+        return self._states().find_one({"_id": STATE_ID})
+
+    def acquire(self) -> str | None:
+        """Nhận lease (atomic): trả về token, hoặc None nếu lượt khác đang giữ lease còn hạn"""
+        token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        try:
+            self._states().find_one_and_update(
+                {"_id": STATE_ID, "$or": [{"lease_owner": None}, {"lease_expires": {"$lt": _now()}}]},
+                {"$set": {"lease_owner": token, "lease_expires": _lease_until()}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # document đã có và lease đang bị giữ: upsert đụng _id
+            return None
+        return token
+
+    def release(self, token: str) -> None:
+        self._states().update_one({"_id": STATE_ID, "lease_owner": token},
+                                  {"$set": {"lease_owner": None, "lease_expires": None}})
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        """Ghi checkpoint và gia hạn lease; raise SyncBusy nếu lease đã bị lượt khác nhận"""
+        state["updated_at"] = _now()
+        fields = {k: v for k, v in state.items() if k not in LEASE_FIELDS}
+        fields["lease_expires"] = _lease_until()
+        result = self._states().update_one({"_id": STATE_ID, "lease_owner": self._token}, {"$set": fields})
+        if result.matched_count == 0:
+            raise SyncBusy("Mất lease sync (đã hết hạn và bị lượt khác nhận)")
+
+    def generation(self) -> Any:
+        """finished_at của lượt sync xong gần nhất (ở worker / process bất kỳ), None nếu chưa có"""
+        return (self._state() or {}).get("finished_at")
+
+    def _id_format(self, name: str) -> str:
+        """Kiểu neo4j_id bản sao đang dùng ('int' / 'str'), lấy từ một document có sẵn"""
+        doc = self._get_collection(name).find_one({"neo4j_id": {"$exists": True}})
+        return "str" if doc and isinstance(doc["neo4j_id"], str) else "int"
+
+    def _new_state(self, mode: str, previous: Dict[str, Any] | None) -> Dict[str, Any]:
+        previous = previous or {}
+        watermark = self._get_neo4j().run_query("RETURN timestamp() AS ts", op="sync")[0]["ts"]
+        state = {
+            "_id": STATE_ID,
+            "status": "running",
+            "mode": mode,
+            "phase": "nodes",
+            "since": None,
+            "after": -1,
+            "rels_after": -1,
+            "watermark": watermark,
+            "started_at": datetime.datetime.now(datetime.timezone.utc),
+            "max_node_id": previous.get("max_node_id", -1),
+            "max_rel_id": previous.get("max_rel_id", -1),
+            "counts": {"nodes": 0, "rels": 0, "upserted": 0, "modified": 0, "deleted": 0},
+            "id_format": {name: self._id_format(name) for name, _, _ in self.PHASES},
+        }
+        if mode == INCREMENTAL and previous.get("status") == "done":
+            if Config.SYNC_UPDATED_PROPERTY:
+                # từ lần chạy trước (watermark là timestamp() của Neo4j lúc bắt đầu lượt đó)
+                state["since"] = previous.get("watermark")
+            else:
+                # không có thuộc tính thời gian: chỉ lấy node / rel mới theo id
+                state["after"] = previous.get("max_node_id", -1)
+                state["rels_after"] = previous.get("max_rel_id", -1)
+        return state
+
+    # ---------- CHẠY ----------
+    def _write(self, name: str, docs: List[Dict[str, Any]], state: Dict[str, Any]) -> None:
+        ops = [UpdateOne({"neo4j_id": d["neo4j_id"]}, {"$set": d}, upsert=True) for d in docs]
+        result = self._get_collection(name).bulk_write(ops, ordered=False)
+        counts = state["counts"]
+        counts[name] += len(docs)
+        counts["upserted"] += result.upserted_count
+        counts["modified"] += result.modified_count
+        metrics.registry.inc("sync_docs_total", {"collection": name}, len(docs))
+
+    def _run_phase(self, name: str, cypher: str, to_doc, state: Dict[str, Any], started: float) -> None:
+        after_key = "after" if name == "nodes" else "rels_after"
+        max_key = "max_node_id" if name == "nodes" else "max_rel_id"
+        params = {
+            "after": state[after_key],
+            "since": state["since"],
+            "prop": Config.SYNC_UPDATED_PROPERTY or "__unused__",
+        }
+        synced_at = state["started_at"]
+        key = ID_FORMATS[state["id_format"][name]]
+        batch: List[Dict[str, Any]] = []
+
+        def flush():
+            self._write(name, batch, state)
+            # checkpoint luôn là id số của Neo4j
+            last_id = int(batch[-1]["neo4j_id"])
+            state[after_key] = last_id
+            state[max_key] = max(state[max_key], last_id)
+            self._save_state(state)
+            elapsed = time.monotonic() - started
+            done = state["counts"]["nodes"] + state["counts"]["rels"]
+            rate = (done - self._resumed_from) / elapsed
+            self._progress = {"phase": name, "docs": done, "docs_per_sec": round(rate, 1)}
+            logger.info("Sync %s: %d document, %.0f doc/s", name, done, rate)
+            batch.clear()
+            if Config.SYNC_PAUSE_MS:
+                # nhường tài nguyên cho API đang đọc cùng collection
+                time.sleep(Config.SYNC_PAUSE_MS / 1000)
+
+        rows = self._get_neo4j().stream_query(cypher, params, fetch_size=Config.SYNC_BATCH_SIZE,
+                                              op=f"sync_{name}")
+        try:
+            for row in rows:
+                batch.append(to_doc(row, synced_at, key))
+                if len(batch) >= Config.SYNC_BATCH_SIZE:
+                    flush()
+            if batch:
+                flush()
+        finally:
+            rows.close()
+
+    def _prune(self, state: Dict[str, Any]) -> None:
+        """Sau lượt full: xóa document không được ghi lại trong lượt này (đã bị xóa khỏi Neo4j)"""
+        for name in ("rels", "nodes"):
+            result = self._get_collection(name).delete_many({
+                "$or": [{"synced_at": {"$lt": state["started_at"]}}, {"synced_at": {"$exists": False}}],
+            })
+            state["counts"]["deleted"] += result.deleted_count
+
+    def run(self, mode: str = INCREMENTAL, resume: bool = True, token: str | None = None) -> Dict[str, Any]:
+        """
+        Chạy một lượt sync, trả về số document + throughput.
+        token: lease đã nhận bằng acquire(); None thì tự nhận, raise SyncBusy nếu không được.
+        """
+        if mode not in (FULL, INCREMENTAL):
+            raise ValueError(f"mode phải là '{FULL}' hoặc '{INCREMENTAL}'")
+        token = token or self.acquire()
+        if token is None:
+            raise SyncBusy("Đang có một lượt sync khác chạy")
+        with self._lock:
+            self._running, self._token = True, token
+        try:
+            return self._run(mode, resume)
+        finally:
+            try:
+                self.release(token)
+            finally:
+                with self._lock:
+                    self._running, self._token = False, None
+
+    def _run(self, mode: str, resume: bool) -> Dict[str, Any]:
+        started = time.monotonic()
+        self.ensure_indexes()
+        previous = self._state()
+        if resume and previous and previous.get("status") == "running":
+            state = previous
+            state.setdefault("id_format", {name: self._id_format(name) for name, _, _ in self.PHASES})
+            logger.info("Sync: chạy tiếp lượt %s từ %s > %s", state["mode"], state["phase"],
+                        state["after"] if state["phase"] == "nodes" else state["rels_after"])
+        else:
+            state = self._new_state(mode, previous)
+            self._save_state(state)
+        # throughput chỉ tính phần ghi trong lượt chạy này
+        self._resumed_from = state["counts"]["nodes"] + state["counts"]["rels"]
+
+        phases = [p[0] for p in self.PHASES]
+        for name, cypher, to_doc in self.PHASES[phases.index(state["phase"]) if state["phase"] in phases else 0:]:
+            state["phase"] = name
+            self._save_state(state)
+            self._run_phase(name, cypher, to_doc, state, started)
+        if state["mode"] == FULL:
+            state["phase"] = "prune"
+            self._save_state(state)
+            self._prune(state)
+
+        state["status"], state["phase"] = "done", None
+        state["finished_at"] = _now()
+        self._save_state(state)
+        elapsed = time.monotonic() - started
+        total = state["counts"]["nodes"] + state["counts"]["rels"]
+        result = {
+            "mode": state["mode"],
+            **state["counts"],
+            "seconds": round(elapsed, 3),
+            "docs_per_sec": round((total - self._resumed_from) / elapsed, 1) if elapsed else None,
+        }
+        self.last_result = result
+        logger.info("Sync xong: %s", result)
+        return result
+
+    # ---------- CHẠY NỀN (ADMIN ROUTE) ----------
+    def start(self, mode: str = INCREMENTAL, resume: bool = True,
+              on_done: Callable[[Dict[str, Any]], None] | None = None) -> bool:
+        """Chạy sync trong thread nền; False nếu đang có lượt khác giữ lease"""
+        # nhận lease ngay trong request để hai POST đồng thời không cùng được 202
+        token = self.acquire()
+        if token is None:
+            return False
+
+        def target():
+            try:
+                result = self.run(mode, resume, token=token)
+                if on_done:
+                    on_done(result)
+            except Exception as e:
+                logger.exception("Sync: lỗi")
+                self.last_result = {"mode": mode, "error": str(e)}
+
+        threading.Thread(target=target, name="graph-sync", daemon=True).start()
+        return True
+
+    @property
+    def running(self) -> bool:
+        """Lượt sync trong process này"""
+        with self._lock:
+            return self._running
+
+    def status(self) -> Dict[str, Any]:
+        state = self._state() or {}
+        state.pop("_id", None)
+        expires = _aware(state.get("lease_expires"))
+        return {
+            # lease còn hạn: có lượt đang chạy ở worker / process bất kỳ
+            "running": bool(state.get("lease_owner")) and expires is not None and expires > _now(),
+            "progress": dict(self._progress) if self.running else None,
+            "last_result": self.last_result,
+            "checkpoint": to_jsonable(state) or None,
+        }
+
+
+# Instance dùng chung trong toàn ứng dụng
+def _collection(name):
+    from clients.mongo_client import mongo_client
+    return mongo_client.get_collection(name)
+
+
+def _neo4j():
+    from clients.neo4j_client import neo4j_client
+    return neo4j_client
+
+
+graph_sync = GraphSync(_collection, _neo4j)
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="đồng bộ lại toàn bộ và xóa document thừa")
+    parser.add_argument("--no-resume", action="store_true", help="bỏ checkpoint dở, bắt đầu lượt mới")
+    parser.add_argument("--batch-size", type=int, help="số node / rel mỗi bulk_write (SYNC_BATCH_SIZE)")
+    parser.add_argument("--indexes-only", action="store_true", help="chỉ tạo index rồi thoát")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.batch_size:
+        Config.SYNC_BATCH_SIZE = args.batch_size
+    if args.indexes_only:
+        for name in graph_sync.ensure_indexes():
+            print(name)
+        return
+    try:
+        result = graph_sync.run(FULL if args.full else INCREMENTAL, resume=not args.no_resume)
+    except SyncBusy as e:
+        raise SystemExit(str(e))
+    print(f"{result['nodes']} node, {result['rels']} rel "
+          f"({result['upserted']} mới, {result['modified']} cập nhật, {result['deleted']} xóa) "
+          f"trong {result['seconds']:.1f}s, {result['docs_per_sec']} doc/s")
+
+
+if __name__ == "__main__":
+    main()
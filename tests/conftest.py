@@ -0,0 +1,29 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def flask_app():
+    """App Flask gắn MongoDB / Neo4j giả lập (benchmarks/fakes.py), không cần Atlas / Aura"""
+    from benchmarks.replay import boot_app
+    return boot_app(200, 0, 0, cache=False, index=False, snapshot=False)
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
+
+
+@pytest.fixture(scope="session")
+def asgi_client():
+    """TestClient của asgi.py với client async giả (cần starlette + httpx)"""
+    pytest.importorskip("httpx")
+    testclient = pytest.importorskip("starlette.testclient")
+    from benchmarks.replay import boot_app
+    with testclient.TestClient(boot_app(200, 0, 0, cache=False, index=False, snapshot=False, asgi=True)) as c:
+        yield c
@@ -0,0 +1,113 @@
+# tests/test_cache.py
+import asyncio
+import threading
+
+import pytest
+
+from services.cache import MemoryBackend, ResponseCache
+
+
+def test_memory_ttl_expiry():
+    backend = MemoryBackend(10)
+    backend.set("a", 1, 60)
+    backend.set("b", 2, -1)
+    assert backend.get("a") == 1
+    assert backend.get("b") is None
+    assert backend.size() == 1
+
+
+def test_memory_lru_eviction():
+    backend = MemoryBackend(2)
+    backend.set("a", 1, 60)
+    backend.set("b", 2, 60)
+    backend.get("a")
+    backend.set("c", 3, 60)
+    assert backend.get("b") is None
+    assert backend.get("a") == 1 and backend.get("c") == 3
+    assert backend.evictions == 1
+
+
+def test_memory_max_bytes():
+    backend = MemoryBackend(100, max_bytes=30)
+    backend.set("a", "x" * 10, 60)
+    backend.set("b", "y" * 10, 60)
+    backend.set("c", "z" * 10, 60)
+    assert backend.get("a") is None
+    assert backend.bytes <= 30
+    # entry lớn hơn max_bytes không được cache và không đẩy entry khác ra
+    backend.set("big", "w" * 100, 60)
+    assert backend.get("big") is None
+    assert backend.get("c") == "z" * 10
+    # ghi đè một key không cộng dồn kích thước cũ
+    backend.set("c", "z" * 10, 60)
+    assert backend.bytes == 24
+
+
+def test_get_or_compute_coalesces_threads():
+    cache = ResponseCache(MemoryBackend(10))
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"ok": True}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("r", "k", 60, compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_compute("r", "k", 60, compute)))
+                 for _ in range(4)]
+    for t in followers:
+        t.start()
+    while cache.stats()["routes"]["r"]["coalesced"] < 4:
+        threading.Event().wait(0.01)
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"ok": True}] * 5
+    assert cache.get_or_compute("r", "k", 60, compute) == {"ok": True}
+    assert cache.stats()["routes"]["r"] == {"hits": 1, "misses": 1, "coalesced": 4}
+
+
+def test_get_or_compute_skips_uncacheable_and_propagates_errors():
+    cache = ResponseCache(MemoryBackend(10))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"timed_out": ["neo4j"]}
+
+    for _ in range(2):
+        cache.get_or_compute("r", "k", 60, compute, cacheable=lambda v: "timed_out" not in v)
+    assert len(calls) == 2
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("r", "err", 60, fail)
+    # lỗi không để lại future treo: lần sau vẫn gọi compute
+    assert cache.get_or_compute("r", "err", 60, lambda: 1) == 1
+
+
+def test_aget_or_compute_coalesces_tasks():
+    cache = ResponseCache(MemoryBackend(10))
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_compute("r", "k", 60, compute) for _ in range(5)))
+
+    assert asyncio.run(main()) == [{"ok": True}] * 5
+    assert len(calls) == 1
+    assert cache.stats()["routes"]["r"] == {"hits": 0, "misses": 1, "coalesced": 4}
@@ -0,0 +1,43 @@
+# tests/test_fanout.py
+import time
+
+import pytest
+
+from clients.config import Config
+from services.cache import response_cache
+
+
+@pytest.fixture
+def slow_neo4j(monkeypatch):
+    """App Flask với Neo4j giả trả lời sau 0.5 s, deadline Neo4j 0.1 s, bật cache"""
+    from benchmarks.replay import boot_app
+    monkeypatch.setattr(Config, "SEARCH_NEO4J_TIMEOUT", 0.1)
+    response_cache.invalidate()
+    app = boot_app(200, 0, 0.5, cache=True, index=False, snapshot=False)
+    yield app.test_client()
+    # trả lại backend / cấu hình của fixture flask_app cho các test sau
+    response_cache.invalidate()
+    boot_app(200, 0, 0, cache=False, index=False, snapshot=False)
+
+
+def test_slow_backend_returns_partial_results(slow_neo4j):
+    started = time.perf_counter()
+    data = slow_neo4j.get("/search", query_string={"query": "Xoài"}).get_json()
+    assert time.perf_counter() - started < 0.5
+    assert data["timed_out"] == ["neo4j"]
+    assert data["neo4j_results"] == []
+    assert data["mongo_nodes"] and "mongo_error" not in data
+
+
+def test_partial_results_are_not_cached(slow_neo4j):
+    before = response_cache.stats()["routes"].get("search", {"hits": 0, "misses": 0})
+    for _ in range(2):
+        assert "timed_out" in slow_neo4j.get("/search", query_string={"query": "Xoài"}).get_json()
+    after = response_cache.stats()["routes"]["search"]
+    assert after["hits"] == before["hits"] and after["misses"] == before["misses"] + 2
+    # cùng route, backend trả kịp: response đầy đủ thì được cache
+    from clients.neo4j_client import neo4j_client
+    neo4j_client.get().driver.latency = 0
+    for _ in range(2):
+        assert "timed_out" not in slow_neo4j.get("/search", query_string={"query": "Xoài"}).get_json()
+    assert response_cache.stats()["routes"]["search"]["hits"] == before["hits"] + 1
@@ -0,0 +1,36 @@
+# tests/test_graph_snapshot.py
+from bson import ObjectId
+
+from benchmarks.fakes import fruit_backends
+from services.graph_snapshot import GraphSnapshot
+from services.queries import mongo_rels_filter
+
+
+def test_rels_without_neo4j_id_are_found_by_object_id():
+    mongo, _ = fruit_backends(50)
+    db = mongo["fruit_graph"]
+    start, end = db["nodes"].docs[0]["neo4j_id"], db["nodes"].docs[1]["neo4j_id"]
+    oid = ObjectId()
+    db["rels"].insert_many([{"_id": oid, "type": "LEGACY", "start_neo4j_id": start, "end_neo4j_id": end}])
+
+    snapshot = GraphSnapshot(db.__getitem__)
+    snapshot.build()
+    rel_ids = snapshot.edge_ids([start])
+    assert oid in rel_ids
+
+    found = list(db["rels"].find(mongo_rels_filter([start], rel_ids)))
+    assert {d["_id"] for d in found} >= {oid}
+    assert len(found) == len(rel_ids)
+
+
+def test_refresh_updates_nodes_rewritten_by_sync():
+    import datetime
+    mongo, _ = fruit_backends(50)
+    db = mongo["fruit_graph"]
+    doc = db["nodes"].docs[0]
+    snapshot = GraphSnapshot(db.__getitem__)
+    snapshot.build()
+    db["nodes"].update_one({"_id": doc["_id"]}, {"$set": {"props": {"rdfs__label": "Sầu riêng"},
+                                                         "synced_at": datetime.datetime(2026, 1, 1)}})
+    snapshot.refresh()
+    assert snapshot.node(doc["neo4j_id"])["label"] == "Sầu riêng"
@@ -0,0 +1,12 @@
+# tests/test_health.py
+import pytest
+
+
+@pytest.mark.parametrize("route", ["/health", "/neo4j/health"])
+def test_health_routes_match(client, asgi_client, route):
+    flask_resp = client.get(route)
+    asgi_resp = asgi_client.get(route)
+    assert flask_resp.status_code == asgi_resp.status_code == 200
+    assert flask_resp.get_json()["ok"] is True
+    assert asgi_resp.json()["ok"] is True
+    assert set(flask_resp.get_json()) == set(asgi_resp.json())
@@ -0,0 +1,94 @@
+# tests/test_metrics.py
+import os
+import subprocess
+import sys
+
+from clients.config import Config
+from services import metrics
+from services.metrics import Registry
+
+
+def test_streamed_response_is_timed_at_close(client, monkeypatch):
+    recorded = []
+
+    def observe(name, labels, value):
+        if name == "http_request_duration_seconds":
+            recorded.append(labels["route"])
+
+    monkeypatch.setattr(metrics.registry, "observe", observe)
+    resp = client.get("/mongo/products", query_string={"export": "ndjson"}, buffered=False)
+    assert recorded == []
+    resp.get_data()
+    resp.close()
+    assert recorded == ["/mongo/products"]
+
+
+def test_dead_worker_snapshots_are_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_DIR", str(tmp_path))
+    # PID của một process đã thoát
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    (tmp_path / f"metrics-{dead.pid}.json").write_text('{"hist": {}, "counters": {"x": [[[], 5]]}}')
+
+    registry = Registry()
+    registry.inc("x", {})
+    snapshots = registry.collect()
+    assert len(snapshots) == 1
+    assert not (tmp_path / f"metrics-{dead.pid}.json").exists()
+
+    registry.remove()
+    assert not os.listdir(tmp_path)
+
+
+def test_asgi_records_response_bytes(asgi_client, monkeypatch):
+    recorded = []
+
+    def inc(name, labels, value=1):
+        if name == "http_response_bytes_total":
+            recorded.append((labels["route"], value))
+
+    monkeypatch.setattr(metrics.registry, "inc", inc)
+    resp = asgi_client.get("/neo4j/nodes?limit=2")
+    assert recorded == [("/neo4j/nodes", len(resp.content))]
+
+
+def test_concurrent_flushes_do_not_clash(tmp_path, monkeypatch):
+    import threading
+    monkeypatch.setattr(Config, "METRICS_DIR", str(tmp_path))
+    registry = Registry()
+    registry.inc("x", {})
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(50):
+                registry.flush()
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert os.listdir(tmp_path) == [f"metrics-{os.getpid()}.json"]
+    registry.remove()
+
+
+def test_mongo_reply_bytes_are_recorded(monkeypatch):
+    import bson
+    from types import SimpleNamespace
+    from clients.mongo_client import _CommandTimer
+
+    recorded = []
+    monkeypatch.setattr(metrics, "record_backend",
+                        lambda backend, op, seconds, rows, error, query, reply_bytes=None:
+                        recorded.append((op, rows, reply_bytes)))
+    reply = {"cursor": {"firstBatch": [{"_id": 1, "label": "Xoài"}], "id": 0}, "ok": 1.0}
+    timer = _CommandTimer()
+    timer.started(SimpleNamespace(command_name="find", command={"find": "nodes", "filter": {}},
+                                  connection_id=("h", 1), request_id=7))
+    timer.succeeded(SimpleNamespace(command_name="find", reply=reply, duration_micros=1000,
+                                    connection_id=("h", 1), request_id=7))
+    assert recorded == [("find:nodes", 1, len(bson.encode(reply)))]
@@ -0,0 +1,91 @@
+# tests/test_mongo_products.py
+import json
+
+import pytest
+
+from clients.config import Config
+
+
+@pytest.mark.parametrize("limit", ["0", "-1", "-100"])
+def test_limit_at_least_one(client, limit):
+    resp = client.get("/mongo/products", query_string={"limit": limit})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["count"] == 1
+    assert body["next"] is not None
+
+
+def test_limit_capped(client):
+    resp = client.get("/mongo/products", query_string={"limit": Config.MONGO_PAGE_MAX_LIMIT * 10})
+    assert resp.status_code == 200
+    assert resp.get_json()["count"] <= Config.MONGO_PAGE_MAX_LIMIT
+
+
+@pytest.mark.parametrize("limit", ["abc", "1.5"])
+def test_limit_not_integer(client, limit):
+    resp = client.get("/mongo/products", query_string={"limit": limit})
+    assert resp.status_code == 400
+    assert resp.get_json()["ok"] is False
+
+
+@pytest.mark.parametrize("key", ["_id", "neo4j_id"])
+def test_walk_all_pages(client, key):
+    from clients.mongo_client import mongo_client
+    total = len(list(mongo_client.get_collection("rels").find({})))
+
+    seen, after = [], None
+    while True:
+        params = {"collection": "rels", "limit": 37, "key": key, "fields": "neo4j_id"}
+        if after:
+            params["after"] = after
+        body = client.get("/mongo/products", query_string=params).get_json()
+        assert body["ok"] is True
+        seen += [d["neo4j_id"] for d in body["data"]]
+        after = body["next"]
+        if after is None:
+            break
+
+    assert len(seen) == total
+    assert len(set(seen)) == total
+
+
+@pytest.mark.parametrize("limit,status,count", [("0", 200, 1), ("-1", 200, 1), ("abc", 400, None)])
+def test_asgi_limit(asgi_client, limit, status, count):
+    resp = asgi_client.get("/mongo/products", params={"limit": limit})
+    assert resp.status_code == status
+    if count is not None:
+        assert resp.json()["count"] == count
+
+
+def _export_all(get, monkeypatch):
+    """Gọi export=ndjson theo từng lượt cho tới khi next là null"""
+    monkeypatch.setattr(Config, "MONGO_EXPORT_MAX_DOCS", 50)
+    seen, after, rounds = [], None, 0
+    while True:
+        params = {"collection": "rels", "export": "ndjson", "fields": "neo4j_id"}
+        if after:
+            params["after"] = after
+        lines = [json.loads(line) for line in get(params).splitlines() if line.strip()]
+        *docs, last = lines
+        assert last["ok"] is True and last["count"] == len(docs) <= 50
+        seen += [d["neo4j_id"] for d in docs]
+        rounds += 1
+        after = last["next"]
+        if after is None:
+            return seen, rounds
+
+
+def test_export_is_bounded_and_resumable(client, monkeypatch):
+    from clients.mongo_client import mongo_client
+    total = len(list(mongo_client.get_collection("rels").find({})))
+    seen, rounds = _export_all(
+        lambda p: client.get("/mongo/products", query_string=p).get_data(as_text=True), monkeypatch)
+    assert len(set(seen)) == len(seen) == total
+    assert rounds > total // 50
+
+
+def test_asgi_export_is_bounded_and_resumable(asgi_client, monkeypatch):
+    from clients.mongo_client import mongo_client
+    total = len(list(mongo_client.get_collection("rels").find({})))
+    seen, _ = _export_all(lambda p: asgi_client.get("/mongo/products", params=p).text, monkeypatch)
+    assert len(set(seen)) == len(seen) == total
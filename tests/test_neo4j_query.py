@@ -0,0 +1,101 @@
+# tests/test_neo4j_query.py
+import json
+
+import pytest
+
+QUERY = "MATCH (n) RETURN n LIMIT 5"
+
+
+@pytest.mark.parametrize("max_rows", ["x", "1.5", [1]])
+def test_asgi_max_rows_invalid(asgi_client, max_rows):
+    resp = asgi_client.post("/neo4j/query", json={"query": QUERY, "max_rows": max_rows})
+    assert resp.status_code == 400
+    assert resp.json()["ok"] is False
+
+
+def test_asgi_max_rows_limits_rows(asgi_client):
+    resp = asgi_client.post("/neo4j/query", json={"query": QUERY, "max_rows": 2})
+    assert resp.json()["count"] == 2 and resp.json()["truncated"] is True
+
+
+@pytest.mark.parametrize("route", ["/neo4j/query", "/neo4j/query/batch"])
+@pytest.mark.parametrize("max_rows", ["x", "1.5", [1]])
+def test_max_rows_invalid(client, route, max_rows):
+    body = {"query": QUERY, "queries": [QUERY], "max_rows": max_rows}
+    resp = client.post(route, json=body)
+    assert resp.status_code == 400
+    assert resp.get_json()["ok"] is False
+
+
+@pytest.mark.parametrize("max_rows", [0, -5])
+def test_max_rows_clamped_to_one(client, max_rows):
+    data = client.post("/neo4j/query", json={"query": QUERY, "max_rows": max_rows}).get_json()
+    assert data["count"] == 1 and data["truncated"] is True
+
+    batch = client.post("/neo4j/query/batch", json={"queries": [QUERY], "max_rows": max_rows}).get_json()
+    assert len(batch["results"][0]["data"]) == 1
+
+
+def _ndjson(lines):
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+def test_ndjson_max_rows_matches_between_apps(client, asgi_client):
+    body = {"query": QUERY, "max_rows": 2, "stream": "ndjson"}
+    flask_rows = _ndjson(client.post("/neo4j/query", json=body).get_data(as_text=True).splitlines())
+    asgi_rows = _ndjson(asgi_client.post("/neo4j/query", json=body).text.splitlines())
+    assert flask_rows[-1] == asgi_rows[-1] == {"ok": True, "count": 2, "truncated": True}
+    assert len(flask_rows) == len(asgi_rows) == 3
+
+
+def test_run_read_batch_keeps_zero_max_rows(flask_app):
+    from clients.neo4j_client import neo4j_client
+    result = neo4j_client.run_read_batch([{"query": QUERY}], max_rows=0, raw=True)
+    assert result[0]["count"] == 0 and result[0]["truncated"] is True
+
+
+@pytest.mark.parametrize("q", [".", "xoai("])
+def test_search_treats_query_as_literal(client, q):
+    single = client.get("/search", query_string={"query": q}).get_json()
+    batch = client.post("/search/batch", json={"terms": [q]}).get_json()
+    assert single["mongo_nodes"] == batch["results"][0]["mongo_nodes"] == []
+
+
+def test_nodes_limit_invalid(client, asgi_client):
+    assert client.get("/neo4j/nodes?limit=abc").status_code == 400
+    assert asgi_client.get("/neo4j/nodes?limit=abc").status_code == 400
+
+
+def test_nodes_limit_capped(client, asgi_client, monkeypatch):
+    from clients.config import Config
+    monkeypatch.setattr(Config, "NEO4J_NODES_MAX_LIMIT", 3)
+    assert client.get("/neo4j/nodes?limit=1000000").get_json()["count"] == 3
+    assert asgi_client.get("/neo4j/nodes?limit=1000000").json()["count"] == 3
+
+
+class _BrokenResult:
+    """Kết quả stream_query bị lỗi ở dòng thứ hai, ghi lại việc close()"""
+
+    def __init__(self):
+        self.rows, self.closed = iter([{"n": 1}]), False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = next(self.rows, None)
+        if row is None:
+            raise RuntimeError("mất kết nối")
+        return row
+
+    def close(self):
+        self.closed = True
+
+
+def test_result_closed_when_rows_fail(client, monkeypatch):
+    from clients.neo4j_client import neo4j_client
+    result = _BrokenResult()
+    monkeypatch.setattr(neo4j_client.get(), "stream_query", lambda *a, **kw: result)
+    resp = client.post("/neo4j/query", json={"query": QUERY})
+    assert resp.status_code == 500
+    assert result.closed
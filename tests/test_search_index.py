@@ -0,0 +1,105 @@
+# tests/test_search_index.py
+import pytest
+from bson import ObjectId
+
+from benchmarks.fakes import fruit_backends
+from services.search_index import LabelIndex
+
+
+@pytest.fixture(scope="module")
+def nodes():
+    mongo, _ = fruit_backends(200)
+    return mongo["fruit_graph"]["nodes"]
+
+
+@pytest.fixture
+def index(nodes):
+    idx = LabelIndex(lambda: nodes)
+    idx.build()
+    return idx
+
+
+def _labels(index, ids):
+    terms = index._data[0]
+    return [terms[i][0] for i in ids]
+
+
+def test_fuzzy_does_not_pad_with_unrelated_nodes(index):
+    assert not any(t.startswith("buoi") for t in _labels(index, index.search("xaoi", 10)))
+    assert _labels(index, index.search("tien giang", 10)) == ["tien giang"]
+
+
+def test_fuzzy_still_catches_typos(index):
+    labels = _labels(index, index.search("xoaii", 10))
+    assert labels and all(t.startswith("xoai") for t in labels)
+
+
+def test_refresh_does_not_mutate_data_seen_by_readers(index, nodes):
+    terms, postings = index._data[:2]
+    before = {g: set(ids) for g, ids in postings.items()}
+    nodes.insert_many([{"_id": ObjectId(), "neo4j_id": 10 ** 6, "labels": ["Fruit"],
+                        "props": {"rdfs__label": "Xoài tượng"}}])
+    try:
+        assert index.refresh() == 1
+        assert index.search("xoai tuong", 5) == [10 ** 6]
+        assert {g: set(ids) for g, ids in postings.items()} == before and 10 ** 6 not in terms
+    finally:
+        nodes.delete_many({"neo4j_id": 10 ** 6})
+
+
+def test_exact_match_survives_large_candidate_set():
+    from benchmarks.fakes import FakeCollection
+    col = FakeCollection("nodes")
+    col.insert_many({"neo4j_id": i, "labels": ["Fruit"], "props": {"rdfs__label": f"Xoài cát {i}"}}
+                    for i in range(5000))
+    col.insert_many([{"neo4j_id": -1, "labels": ["Fruit"], "props": {"rdfs__label": "Xoài"}}])
+    idx = LabelIndex(lambda: col)
+    idx.build()
+    for q in ("xoài", "xoai", "Xoai"):
+        ids = idx.search(q, 10)
+        assert ids[0] == -1 and len(ids) == 10
+    # substring (không phải prefix) vẫn xếp chuỗi ngắn nhất lên đầu
+    assert idx.search("cat 4999", 1) == [4999]
+
+
+def test_refresh_picks_up_docs_rewritten_by_sync():
+    import datetime
+    from benchmarks.fakes import FakeCollection
+    col = FakeCollection("nodes")
+    t0 = datetime.datetime(2026, 1, 1)
+    col.insert_many([{"neo4j_id": i, "labels": ["Fruit"], "props": {"rdfs__label": f"Chuối {i}"},
+                      "synced_at": t0} for i in range(3)])
+    idx = LabelIndex(lambda: col)
+    idx.build()
+    # sync ghi lại document cũ (cùng _id): refresh theo synced_at phải thấy nhãn mới
+    col.update_one({"neo4j_id": 1}, {"$set": {"props": {"rdfs__label": "Măng cụt"},
+                                              "synced_at": t0 + datetime.timedelta(hours=1)}})
+    assert idx.refresh() == 1
+    assert idx.search("mang cut", 5) == [1]
+    assert 1 not in idx.search("chuoi", 5)
+    assert idx.refresh() == 0
+
+
+def test_new_sync_generation_triggers_rebuild(monkeypatch):
+    import threading
+    import time
+    from benchmarks.fakes import FakeCollection
+    from clients.config import Config
+    col = FakeCollection("nodes")
+    col.insert_many([{"neo4j_id": i, "labels": ["Fruit"], "props": {"rdfs__label": f"Ổi {i}"}}
+                     for i in range(3)])
+    generation = [None]
+    idx = LabelIndex(lambda: col, lambda: generation[0])
+    monkeypatch.setattr(Config, "SEARCH_INDEX_REFRESH_SECONDS", 0.01)
+    threading.Thread(target=idx._run, daemon=True).start()
+    deadline = time.monotonic() + 5
+    while not idx.ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert idx.search("oi 2", 5) == [2]
+
+    # lượt sync (ở worker khác) xóa node 2: refresh không thấy, lượt mới trong sync_state thì nạp lại
+    col.delete_many({"neo4j_id": 2})
+    generation[0] = "done-1"
+    while idx.search("oi 2", 5) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert idx.search("oi 2", 5) == []
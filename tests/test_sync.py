@@ -0,0 +1,107 @@
+# tests/test_sync.py
+import datetime
+
+import pytest
+
+from benchmarks.fakes import fruit_backends
+from clients.neo4j_client import Neo4jClient
+from clients.config import Config
+from services.pagination import parse_bool
+from services.sync import FULL, INCREMENTAL, STATE_ID, GraphSync, SyncBusy
+
+
+@pytest.fixture
+def backends():
+    mongo, driver = fruit_backends(50)
+    return mongo["fruit_graph"], Neo4jClient(driver=driver)
+
+
+def _sync(backends) -> GraphSync:
+    db, neo4j = backends
+    # mỗi GraphSync giống một worker / process riêng, chỉ dùng chung MongoDB
+    return GraphSync(db.__getitem__, lambda: neo4j)
+
+
+def test_lease_is_exclusive_across_instances(backends):
+    first, second = _sync(backends), _sync(backends)
+    token = first.acquire()
+    assert token
+    assert second.acquire() is None
+    assert second.start(FULL) is False
+    assert second.status()["running"] is True
+    with pytest.raises(SyncBusy):
+        second.run(FULL)
+
+    first.release(token)
+    assert second.status()["running"] is False
+    assert second.acquire()
+
+
+def test_expired_lease_is_taken_over(backends):
+    db, _ = backends
+    stale, fresh = _sync(backends), _sync(backends)
+    stale._token = stale.acquire()
+    past = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=1)
+    db["sync_state"].update_one({"_id": STATE_ID}, {"$set": {"lease_expires": past}})
+
+    assert fresh.acquire()
+    # lượt cũ không còn ghi được checkpoint
+    with pytest.raises(SyncBusy):
+        stale._save_state({"status": "running"})
+
+
+def test_run_releases_lease(backends):
+    db, _ = backends
+    sync = _sync(backends)
+    result = sync.run(FULL)
+    assert result["nodes"] == len(db["nodes"].docs)
+    state = db["sync_state"].find_one({"_id": STATE_ID})
+    assert state["status"] == "done" and state["lease_owner"] is None
+    assert sync.status()["running"] is False
+    assert _sync(backends).acquire()
+
+
+def test_string_ids_in_mirror_are_kept(backends):
+    db, _ = backends
+    for name in ("nodes", "rels"):
+        for d in db[name].docs:
+            d["neo4j_id"] = str(d["neo4j_id"])
+    before = {name: len(db[name].docs) for name in ("nodes", "rels")}
+
+    _sync(backends).run(FULL)
+    _sync(backends).run(INCREMENTAL)
+    for name in ("nodes", "rels"):
+        assert len(db[name].docs) == before[name]
+        assert all(isinstance(d["neo4j_id"], str) for d in db[name].docs)
+    assert all(isinstance(d["start_neo4j_id"], str) for d in db["rels"].docs)
+
+
+@pytest.mark.parametrize("resume", ["maybe", "yes", 2])
+def test_admin_sync_rejects_bad_resume(client, monkeypatch, resume):
+    monkeypatch.setattr(Config, "ADMIN_TOKEN", "t")
+    resp = client.post("/admin/sync", json={"resume": resume}, headers={"X-Admin-Token": "t"})
+    assert resp.status_code == 400
+
+
+def test_parse_bool_is_strict():
+    assert parse_bool("false", True, "resume") is False
+    assert parse_bool("0", True, "resume") is False
+    assert parse_bool(None, True, "resume") is True
+
+
+def test_unique_index_failure_falls_back_to_plain_index(backends, monkeypatch):
+    from pymongo.errors import OperationFailure
+    db, _ = backends
+    calls = []
+
+    def create_index(keys, **options):
+        calls.append(options)
+        if options.get("unique"):
+            raise OperationFailure("E11000 duplicate key error")
+        return "_".join(f"{k}_{d}" for k, d in keys)
+
+    monkeypatch.setattr(db["rels"], "create_index", create_index)
+    created = _sync(backends).ensure_indexes()
+    assert "rels.neo4j_id_1" in created
+    assert calls[0]["partialFilterExpression"] == {"neo4j_id": {"$exists": True}}
+    assert calls[1] == {}